@@ -0,0 +1 @@
+default_app_config = 'authors.apps.articles.apps.ArticlesConfig'
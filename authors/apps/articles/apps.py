@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class ArticlesConfig(AppConfig):
-    name = 'articles'
+    name = 'authors.apps.articles'
+    label = 'articles'
+
+    def ready(self):
+        import authors.apps.articles.signals
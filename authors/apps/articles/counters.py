@@ -0,0 +1,222 @@
+"""
+Write-behind buffering of the reaction counters of articles.
+
+When REACTION_COUNTER_BUFFERING is on, reactions do not update the counter
+columns of their article. Each change is added to a delta kept in the
+`counters` cache, and `flush` later writes the deltas of many articles to
+the database with one UPDATE per batch. Readers add the pending deltas to
+the persisted counters, so responses stay current between flushes.
+
+Each delta is kept as two non-negative totals, of increments and of
+decrements, since memcached clamps counters at zero and Django turns a
+negative `incr` into a `decr`. Only the atomic `add`, `incr` and `decr`
+operations of the cache are relied on, so memcached and redis both work,
+provided entries are not evicted: an evicted total loses its changes.
+
+Articles with pending deltas are listed in an append-only log of numbered
+slots. A writer appends an article only when it is not already marked
+dirty, and the flusher works through the log from the last slot it
+flushed. A slot that stays missing for SLOT_GRACE seconds, because its
+writer died before storing it or it was evicted, is skipped. The dirty
+marker expires after DIRTY_TIMEOUT seconds, so an article whose slot was
+lost is logged again by its next change.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+FIELDS = ('likes', 'dislikes', 'favourite_count')
+
+SEQUENCE_KEY = 'counters:sequence'
+FLUSHED_KEY = 'counters:flushed'
+LOCK_KEY = 'counters:flush-lock'
+LOCK_TIMEOUT = 300
+SLOT_GRACE = 60
+DIRTY_TIMEOUT = 600
+
+# Totals of the increments and of the decrements of a counter
+SIGNS = ('up', 'down')
+
+
+def get_cache():
+    return caches['counters']
+
+
+def is_enabled():
+    return settings.REACTION_COUNTER_BUFFERING
+
+
+def delta_key(article_id, field, sign):
+    return 'counters:delta:{}:{}:{}'.format(article_id, field, sign)
+
+
+def dirty_key(article_id):
+    return 'counters:dirty:{}'.format(article_id)
+
+
+def slot_key(number):
+    return 'counters:slot:{}'.format(number)
+
+
+def missing_key(slot):
+    return '{}:missing'.format(slot)
+
+
+def add(article_id, field, delta):
+    """Add delta to the pending change of a counter of an article"""
+    cache = get_cache()
+    key = delta_key(article_id, field, 'up' if delta > 0 else 'down')
+    cache.add(key, 0)
+    cache.incr(key, abs(delta))
+
+    if cache.add(dirty_key(article_id), True, timeout=DIRTY_TIMEOUT):
+        cache.add(SEQUENCE_KEY, 0)
+        cache.set(slot_key(cache.incr(SEQUENCE_KEY)), article_id)
+
+
+def read(article_ids):
+    """Get the totals of increments and decrements pending for articles
+    :return {article_id: {field: {sign: total}}} for the non-zero totals"""
+    keys = {
+        delta_key(article_id, field, sign): (article_id, field, sign)
+        for article_id in article_ids for field in FIELDS for sign in SIGNS
+    }
+    totals = {}
+    for key, total in get_cache().get_many(list(keys)).items():
+        if total:
+            article_id, field, sign = keys[key]
+            totals.setdefault(article_id, {}).setdefault(field, {})[
+                sign
+            ] = total
+    return totals
+
+
+def net(totals):
+    """Turn totals from `read` into {article_id: {field: delta}}, leaving
+    out the counters whose changes cancel out"""
+    changes = {}
+    for article_id, fields in totals.items():
+        for field, signs in fields.items():
+            delta = signs.get('up', 0) - signs.get('down', 0)
+            if delta:
+                changes.setdefault(article_id, {})[field] = delta
+    return changes
+
+
+def pending(article_ids):
+    """Get the pending counter changes of articles
+    :return {article_id: {field: delta}} for the articles that have any"""
+    if not is_enabled() or not article_ids:
+        return {}
+    return net(read(article_ids))
+
+
+def apply_pending(articles):
+    """Add the pending counter changes to loaded articles, once per instance"""
+    articles = [
+        article for article in articles
+        if not getattr(article, '_pending_counters_applied', False)
+    ]
+    changes = pending([article.id for article in articles])
+    for article in articles:
+        for field, delta in changes.get(article.id, {}).items():
+            setattr(article, field, getattr(article, field) + delta)
+        article._pending_counters_applied = True
+
+
+def flush(batch_size=500):
+    """Write the pending counter changes to the database
+    :return number of articles updated"""
+    cache = get_cache()
+    # A second flusher would apply the same deltas twice
+    if not cache.add(LOCK_KEY, True, timeout=LOCK_TIMEOUT):
+        return 0
+
+    try:
+        flushed = cache.get(FLUSHED_KEY, 0)
+        last = cache.get(SEQUENCE_KEY, 0)
+        updated = 0
+        while flushed < last:
+            slots = [
+                slot_key(number) for number in
+                range(flushed + 1, min(flushed + batch_size, last) + 1)
+            ]
+            found = cache.get_many(slots)
+            # Stop at a slot whose writer may still be storing the article
+            taken = 0
+            article_ids = []
+            for key in slots:
+                if key in found:
+                    article_ids.append(found[key])
+                elif not is_abandoned(key):
+                    break
+                taken += 1
+            if not taken:
+                break
+
+            # Later changes mark the articles dirty and log them again
+            cache.delete_many([dirty_key(pk) for pk in article_ids])
+            totals = read(article_ids)
+            changes = net(totals)
+            write(changes)
+            # Only what was written is taken off; concurrent changes remain
+            for article_id, fields in totals.items():
+                for field, signs in fields.items():
+                    for sign, total in signs.items():
+                        cache.decr(delta_key(article_id, field, sign), total)
+
+            cache.delete_many(
+                slots[:taken] + [missing_key(key) for key in slots[:taken]]
+            )
+            flushed += taken
+            cache.set(FLUSHED_KEY, flushed)
+            updated += len(changes)
+            if taken < len(slots):
+                break
+        return updated
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def is_abandoned(slot):
+    """Whether a slot has been missing for SLOT_GRACE seconds or more"""
+    cache = get_cache()
+    cache.add(missing_key(slot), time.time())
+    first_missed = cache.get(missing_key(slot), time.time())
+    return time.time() - first_missed >= SLOT_GRACE
+
+
+def write(changes):
+    """Apply counter changes to their articles with one UPDATE, marking
+    the articles that gained reactions as active"""
+    if not changes:
+        return
+    from .models import Article
+
+    rows = [
+        [article_id] + [deltas.get(field, 0) for field in FIELDS]
+        for article_id, deltas in changes.items()
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE {articles} AS a SET {assignments}, '
+            'last_activity = CASE WHEN greatest({deltas}) > 0 '
+            'THEN now() ELSE a.last_activity END '
+            'FROM (VALUES {values}) AS d (id, {fields}) '
+            'WHERE a.id = d.id'.format(
+                articles=connection.ops.quote_name(Article._meta.db_table),
+                assignments=', '.join(
+                    '{0} = greatest(a.{0} + d.{0}, 0)'.format(field)
+                    for field in FIELDS
+                ),
+                values=', '.join(
+                    '({})'.format(', '.join(['%s'] * len(row)))
+                    for row in rows
+                ),
+                fields=', '.join(FIELDS),
+                deltas=', '.join('d.{}'.format(field) for field in FIELDS)
+            ),
+            [value for row in rows for value in row]
+        )
@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from authors.apps.articles.models import Comment
+from authors.apps.authentication.models import User
+from authors.apps.profiles.models import Profile
+
+LEGACY_COLUMN = 'author_name'
+
+
+class Command(BaseCommand):
+    help = (
+        "Comments now show the current username of their author, so the "
+        "author_name column they used to copy it into is no longer read. "
+        "The migration that removes it from the model leaves the column in "
+        "place, so code that still reads it during a rollout keeps working. "
+        "Refresh it from the authors' usernames in batches while anything "
+        "reads it, then drop it with --drop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Drop the column instead of refreshing it'
+        )
+
+    def handle(self, *args, **options):
+        table = Comment._meta.db_table
+        with connection.cursor() as cursor:
+            columns = [
+                column.name for column in
+                connection.introspection.get_table_description(cursor, table)
+            ]
+        if LEGACY_COLUMN not in columns:
+            self.stdout.write(self.style.SUCCESS('Nothing to backfill'))
+            return
+
+        if options['drop']:
+            with connection.cursor() as cursor:
+                cursor.execute('ALTER TABLE {} DROP COLUMN {}'.format(
+                    connection.ops.quote_name(table),
+                    connection.ops.quote_name(LEGACY_COLUMN)
+                ))
+            self.stdout.write(self.style.SUCCESS(
+                'Dropped {}.{}'.format(table, LEGACY_COLUMN)
+            ))
+            return
+
+        batch_size = options['batch_size']
+        ids = Comment.objects.aggregate(Min('id'), Max('id'))
+        min_id, max_id = ids['id__min'] or 1, ids['id__max'] or 0
+        refreshed = 0
+        for start in range(min_id - 1, max_id, batch_size):
+            with transaction.atomic():
+                refreshed += self.refresh(start, start + batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Refreshed the author name of {} comments'.format(refreshed)
+        ))
+
+    @staticmethod
+    def refresh(start, end):
+        """Copy the current usernames into the comments in an id range
+        that hold a missing or stale one"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {comments} AS c SET {legacy} = u.username '
+                'FROM {profiles} AS p, {users} AS u '
+                'WHERE c.id > %s AND c.id <= %s '
+                'AND p.id = c.author_id AND u.id = p.user_id '
+                'AND c.{legacy} IS DISTINCT FROM u.username'.format(
+                    comments=connection.ops.quote_name(
+                        Comment._meta.db_table
+                    ),
+                    profiles=connection.ops.quote_name(
+                        Profile._meta.db_table
+                    ),
+                    users=connection.ops.quote_name(User._meta.db_table),
+                    legacy=connection.ops.quote_name(LEGACY_COLUMN)
+                ),
+                [start, end]
+            )
+            return cursor.rowcount
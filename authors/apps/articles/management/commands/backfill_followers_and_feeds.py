@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max, Min
+
+from authors.apps.articles.models import FeedItem
+from authors.apps.profiles.models import Profile
+
+
+class Command(BaseCommand):
+    help = (
+        "Set the followers count of every profile from the follows table, "
+        "then deliver the articles of each followed author with at most "
+        "FEED_FANOUT_LIMIT followers into the feeds of their followers, "
+        "in batches of profiles. Run it once after the migrations that add "
+        "the followers count and the feed table, on a database that already "
+        "has follows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = Profile.objects.aggregate(Min('id'), Max('id'))
+        min_id, max_id = ids['id__min'] or 1, ids['id__max'] or 0
+
+        counted = 0
+        for start in range(min_id - 1, max_id, batch_size):
+            with transaction.atomic():
+                counted += self.count_followers(start, start + batch_size)
+
+        delivered = 0
+        for start in range(min_id - 1, max_id, batch_size):
+            with transaction.atomic():
+                delivered += self.fill_feeds(start, start + batch_size)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Counted the followers of {} profiles and filled {} feeds'.format(
+                counted, delivered
+            )
+        ))
+
+    @staticmethod
+    def count_followers(start, end):
+        """Set the followers count of the profiles in an id range
+        :return number of profiles updated"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {profiles} AS p SET followers_count = ('
+                'SELECT count(*) FROM {follows} AS f '
+                'WHERE f.to_profile_id = p.id) '
+                'WHERE p.id > %s AND p.id <= %s'.format(
+                    profiles=connection.ops.quote_name(
+                        Profile._meta.db_table
+                    ),
+                    follows=connection.ops.quote_name(
+                        Profile.following.through._meta.db_table
+                    )
+                ),
+                [start, end]
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def fill_feeds(start, end):
+        """Deliver the articles of fanned out authors to the feeds of the
+        followers in an id range
+        :return number of feeds filled"""
+        follows = Profile.following.through.objects.filter(
+            from_profile_id__gt=start, from_profile_id__lte=end,
+            to_profile__followers_count__lte=settings.FEED_FANOUT_LIMIT
+        ).values_list('from_profile_id', 'to_profile_id')
+
+        followed = defaultdict(list)
+        for follower_id, author_id in follows:
+            followed[follower_id].append(author_id)
+        for follower_id, author_ids in followed.items():
+            FeedItem.backfill(follower_id, author_ids)
+        return len(followed)
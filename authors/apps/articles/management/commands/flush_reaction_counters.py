@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from authors.apps.articles import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the buffered like, dislike and favourite counts to the "
+        "articles. Pass --interval to keep flushing every few seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Seconds to wait between flushes; flush once if omitted.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            updated = counters.flush(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                'Reaction counters flushed for {} articles'.format(updated)
+            ))
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
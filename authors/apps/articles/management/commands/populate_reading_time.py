@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import CharField, Case, IntegerField, Value, When
+
+from authors.apps.articles.models import Article
+
+
+class Command(BaseCommand):
+    help = "Populate the word count and reading time of existing articles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(
+                Article.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'body')[:batch_size]
+            )
+            if not batch:
+                break
+
+            word_counts = {
+                article_id: Article.count_words(body)
+                for article_id, body in batch
+            }
+            with transaction.atomic():
+                updated += Article.objects.filter(
+                    id__in=word_counts
+                ).update(
+                    word_count=self.case(
+                        word_counts, int, IntegerField()
+                    ),
+                    reading_minutes=self.case(
+                        word_counts, Article.reading_minutes_for,
+                        IntegerField()
+                    ),
+                    reading_time=self.case(
+                        word_counts, Article.reading_time_for, CharField()
+                    )
+                )
+            last_id = batch[-1][0]
+
+        self.stdout.write(self.style.SUCCESS(
+            'Reading time populated for {} articles'.format(updated)
+        ))
+
+    @staticmethod
+    def case(word_counts, compute, output_field):
+        """Build a CASE expression setting a per row value in one UPDATE"""
+        whens = [
+            When(id=article_id, then=Value(compute(count)))
+            for article_id, count in word_counts.items()
+        ]
+        return Case(*whens, output_field=output_field)
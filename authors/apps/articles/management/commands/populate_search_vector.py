@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from authors.apps.articles.models import Article, ARTICLE_SEARCH_VECTOR
+
+
+class Command(BaseCommand):
+    help = "Populate the search vector of existing articles in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            ids = list(
+                Article.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            updated += Article.objects.filter(id__in=ids).update(
+                search_vector=ARTICLE_SEARCH_VECTOR
+            )
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(
+            'Search vector populated for {} articles'.format(updated)
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from authors.apps.articles.models import Article
+
+
+class Command(BaseCommand):
+    help = "Rebuild the rating sum, count and average of every article."
+
+    def handle(self, *args, **options):
+        updated = Article.reconcile_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            'Ratings reconciled for {} articles'.format(updated)
+        ))
@@ -0,0 +1,33 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from authors.apps.articles.models import Article
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the trending scores of recently active articles. "
+        "Meant to be run periodically, e.g. every few minutes by a scheduler."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-days', type=int, default=7,
+            help='Only articles published, reacted to, rated or commented '
+                 'on within this many days can trend.'
+        )
+        parser.add_argument(
+            '--gravity', type=float, default=1.8,
+            help='How quickly scores decay with the time since the latest '
+                 'activity on an article.'
+        )
+
+    def handle(self, *args, **options):
+        scored = Article.update_trending_scores(
+            window=timedelta(days=options['window_days']),
+            gravity=options['gravity']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Trending scores updated for {} articles'.format(scored)
+        ))
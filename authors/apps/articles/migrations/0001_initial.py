@@ -0,0 +1,97 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:49
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Article',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(max_length=140, null=True, unique=True)),
+                ('title', models.CharField(max_length=150, null=True)),
+                ('description', models.CharField(max_length=255, null=True)),
+                ('body', models.TextField(null=True)),
+                ('createdAt', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updatedAt', models.DateTimeField(auto_now=True, null=True)),
+                ('likes', models.PositiveIntegerField(default=0)),
+                ('dislikes', models.PositiveIntegerField(default=0)),
+                ('favourite_count', models.PositiveIntegerField(default=0)),
+                ('reading_time', models.CharField(max_length=100, null=True)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('rating', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='profiles.Profile')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Comment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('body', models.TextField(null=True)),
+                ('author_name', models.TextField(null=True)),
+                ('parent', models.TextField(blank=True, null=True)),
+                ('thread_count', models.PositiveIntegerField(default=0)),
+                ('article', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='articles.Article')),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='profiles.Profile')),
+            ],
+            options={
+                'ordering': ['-created_at', 'updated_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Impression',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('description', models.CharField(max_length=100)),
+                ('image', models.URLField(blank=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Rate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rating', models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('article', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='articles.Article')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='articles.Article')),
+                ('reaction', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='articles.Impression')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tag', models.CharField(max_length=255)),
+                ('createdAt', models.DateTimeField(auto_now_add=True, null=True)),
+                ('updatedAt', models.DateTimeField(auto_now=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='tags',
+            field=models.ManyToManyField(related_name='articles', to='articles.Tag'),
+        ),
+    ]
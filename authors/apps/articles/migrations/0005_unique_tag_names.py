@@ -0,0 +1,76 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:49
+
+from django.db import migrations, models, transaction
+from django.db.models import Count
+
+BATCH_SIZE = 1000
+
+
+def merge_duplicate_tags(apps, schema_editor):
+    """Merge tags that share a name into the one with the lowest id, moving
+    their article links over and dropping the links that would repeat, a
+    batch of names per transaction"""
+    Tag = apps.get_model('articles', 'Tag')
+    Article = apps.get_model('articles', 'Article')
+    connection = schema_editor.connection
+    tables = {
+        'tags': schema_editor.quote_name(Tag._meta.db_table),
+        'links': schema_editor.quote_name(
+            Article._meta.get_field('tags').remote_field.through._meta.db_table
+        ),
+    }
+    names = list(
+        Tag.objects.using(connection.alias).values('tag').annotate(
+            count=Count('id')
+        ).filter(count__gt=1).order_by('tag').values_list('tag', flat=True)
+    )
+    for start in range(0, len(names), BATCH_SIZE):
+        batch = names[start:start + BATCH_SIZE]
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            # An article linked to several tags of a name keeps one link
+            cursor.execute(
+                'DELETE FROM {links} AS l USING {tags} AS t '
+                'WHERE t.id = l.tag_id AND t.tag = ANY(%s) AND EXISTS ('
+                'SELECT 1 FROM {links} AS o JOIN {tags} AS p ON p.id = o.tag_id '
+                'WHERE o.article_id = l.article_id AND p.tag = t.tag '
+                'AND p.id < t.id)'.format(**tables),
+                [batch]
+            )
+            cursor.execute(
+                'WITH kept AS (SELECT tag, min(id) AS id FROM {tags} '
+                'WHERE tag = ANY(%s) GROUP BY tag) '
+                'UPDATE {links} AS l SET tag_id = kept.id '
+                'FROM {tags} AS t, kept '
+                'WHERE t.id = l.tag_id AND t.tag = kept.tag '
+                'AND t.id <> kept.id'.format(**tables),
+                [batch]
+            )
+            cursor.execute(
+                'WITH kept AS (SELECT tag, min(id) AS id FROM {tags} '
+                'WHERE tag = ANY(%s) GROUP BY tag) '
+                'DELETE FROM {tags} AS t USING kept '
+                'WHERE t.tag = kept.tag AND t.id <> kept.id'.format(**tables),
+                [batch]
+            )
+
+
+class Migration(migrations.Migration):
+
+    # Each batch of the merge commits on its own
+    atomic = False
+
+    dependencies = [
+        ('articles', '0004_article_reading_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_tags, migrations.RunPython.noop
+        ),
+        migrations.AlterField(
+            model_name='tag',
+            name='tag',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
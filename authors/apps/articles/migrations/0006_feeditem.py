@@ -0,0 +1,44 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0002_profile_followers_count'),
+        ('articles', '0005_unique_tag_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('article_created', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-createdAt', '-id'], name='article_author_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='article',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='articles.Article'),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='profiles.Profile'),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['owner', '-article_created', '-article'], name='feed_owner_created_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='feeditem',
+            unique_together={('owner', 'article')},
+        ),
+    ]
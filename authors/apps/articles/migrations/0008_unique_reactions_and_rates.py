@@ -0,0 +1,94 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:49
+
+from django.conf import settings
+from django.db import migrations, transaction
+from django.db.models import Avg, Count, Exists, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+# The counter of an article that each impression is counted in
+COUNTERS = {
+    'Like': 'likes',
+    'Dislike': 'dislikes',
+    'Favourite': 'favourite_count',
+}
+
+
+def dedupe(model, fields, using):
+    """Delete rows that repeat an earlier row on the given fields, one id
+    range per transaction
+    :return ids of the articles affected"""
+    rows = model.objects.using(using)
+    ids = rows.aggregate(Min('id'), Max('id'))
+    min_id, max_id = ids['id__min'] or 1, ids['id__max'] or 0
+    earlier = rows.filter(
+        id__lt=OuterRef('id'),
+        **{field: OuterRef(field) for field in fields}
+    )
+    articles = set()
+    for start in range(min_id - 1, max_id, BATCH_SIZE):
+        with transaction.atomic(using=using):
+            duplicates = rows.filter(
+                id__gt=start, id__lte=start + BATCH_SIZE,
+                **{'{}__isnull'.format(field): False for field in fields}
+            ).annotate(
+                duplicate=Exists(earlier)
+            ).filter(duplicate=True)
+            articles.update(duplicates.values_list('article_id', flat=True))
+            rows.filter(
+                id__in=list(duplicates.values_list('id', flat=True))
+            ).delete()
+    return articles
+
+
+def dedupe_reactions_and_rates(apps, schema_editor):
+    """Delete duplicate reactions and ratings, keeping the earliest of each,
+    and recount the reactions and the average rating of the articles that
+    had any"""
+    Article = apps.get_model('articles', 'Article')
+    Reaction = apps.get_model('articles', 'Reaction')
+    Rate = apps.get_model('articles', 'Rate')
+    using = schema_editor.connection.alias
+
+    articles = dedupe(Reaction, ('article', 'user', 'reaction'), using)
+    counts = Reaction.objects.using(using).filter(
+        article=OuterRef('pk')
+    ).values('article').annotate(count=Count('id')).values('count')
+    Article.objects.using(using).filter(id__in=articles).update(**{
+        field: Coalesce(Subquery(counts.filter(reaction__name=name)), 0)
+        for name, field in COUNTERS.items()
+    })
+
+    articles = dedupe(Rate, ('article', 'user'), using)
+    average = Rate.objects.using(using).filter(
+        article=OuterRef('pk')
+    ).values('article').annotate(average=Avg('rating')).values('average')
+    Article.objects.using(using).filter(id__in=articles).update(
+        rating=Coalesce(Subquery(average), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    # Each batch of the deduplication commits on its own
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('articles', '0007_article_trending_score'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            dedupe_reactions_and_rates, migrations.RunPython.noop
+        ),
+        migrations.AlterUniqueTogether(
+            name='rate',
+            unique_together={('article', 'user')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='reaction',
+            unique_together={('article', 'user', 'reaction')},
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:49
+
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min
+import django.db.models.deletion
+
+BATCH_SIZE = 5000
+
+
+def id_ranges(Comment, using):
+    ids = Comment.objects.using(using).aggregate(Min('id'), Max('id'))
+    min_id, max_id = ids['id__min'] or 1, ids['id__max'] or 0
+    return [
+        (start, start + BATCH_SIZE)
+        for start in range(min_id - 1, max_id, BATCH_SIZE)
+    ]
+
+
+def convert_parents(apps, schema_editor):
+    """Copy the parent ids held in the text column into the foreign key,
+    then delete the replies whose parent comment was deleted, with the
+    replies to them, and take them off their articles' comment counts,
+    one id range per transaction. Every parent is copied before any orphan
+    is deleted, so that the replies to an orphan go with it"""
+    Comment = apps.get_model('articles', 'Comment')
+    Article = apps.get_model('articles', 'Article')
+    connection = schema_editor.connection
+    tables = {
+        'comments': schema_editor.quote_name(Comment._meta.db_table),
+        'articles': schema_editor.quote_name(Article._meta.db_table),
+    }
+    ranges = id_ranges(Comment, connection.alias)
+    for start, end in ranges:
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {comments} AS c SET new_parent_id = p.id '
+                'FROM {comments} AS p '
+                'WHERE c.id > %s AND c.id <= %s AND c.new_parent_id IS NULL '
+                "AND c.parent ~ '^[0-9]{{1,9}}$' "
+                'AND p.id = c.parent::integer'.format(**tables),
+                [start, end]
+            )
+    for start, end in ranges:
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                'WITH RECURSIVE orphans AS ('
+                'SELECT id FROM {comments} '
+                'WHERE id > %s AND id <= %s '
+                "AND parent <> '' AND new_parent_id IS NULL "
+                'UNION SELECT c.id FROM {comments} AS c '
+                'JOIN orphans AS o ON c.new_parent_id = o.id), '
+                'deleted AS ('
+                'DELETE FROM {comments} WHERE id IN (SELECT id FROM orphans) '
+                'RETURNING article_id) '
+                'UPDATE {articles} AS a '
+                'SET comment_count = greatest(a.comment_count - d.count, 0) '
+                'FROM (SELECT article_id, count(*) FROM deleted '
+                'GROUP BY article_id) AS d '
+                'WHERE a.id = d.article_id'.format(**tables),
+                [start, end]
+            )
+
+
+def restore_parents(apps, schema_editor):
+    """Copy the parent ids back into the text column"""
+    Comment = apps.get_model('articles', 'Comment')
+    connection = schema_editor.connection
+    for start, end in id_ranges(Comment, connection.alias):
+        with transaction.atomic(using=connection.alias), \
+                connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {} SET parent = new_parent_id::text '
+                'WHERE id > %s AND id <= %s '
+                'AND new_parent_id IS NOT NULL'.format(
+                    schema_editor.quote_name(Comment._meta.db_table)
+                ),
+                [start, end]
+            )
+
+
+class Migration(migrations.Migration):
+    """Replaces the text parent of comments with a foreign key. The key is
+    added as a new nullable column, filled in batches, and renamed once
+    the text column is gone, so no step rewrites the table"""
+
+    # Each batch of the conversion commits on its own
+    atomic = False
+
+    dependencies = [
+        ('articles', '0010_article_star_counts'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={},
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='new_parent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='articles.Comment'),
+        ),
+        migrations.RunPython(convert_parents, restore_parents),
+        migrations.RemoveField(
+            model_name='comment',
+            name='parent',
+        ),
+        migrations.RenameField(
+            model_name='comment',
+            old_name='new_parent',
+            new_name='parent',
+        ),
+        migrations.AlterField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='articles.Comment'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['article', 'parent', 'id'], name='comment_article_parent_idx'),
+        ),
+    ]
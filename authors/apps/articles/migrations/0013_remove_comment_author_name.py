@@ -0,0 +1,25 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:49
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Stops reading the author name copied into comments. The column stays
+    in the table for code that reads it during a rollout; the
+    backfill_comment_author_names command refreshes it, and drops it once
+    nothing reads it"""
+
+    dependencies = [
+        ('articles', '0012_comment_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='comment',
+                    name='author_name',
+                ),
+            ],
+        ),
+    ]
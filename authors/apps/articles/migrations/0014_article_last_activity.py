@@ -0,0 +1,30 @@
+# Generated by Django 2.1.2 on 2026-10-18 10:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0013_remove_comment_author_name'),
+    ]
+
+    operations = [
+        # Existing articles are left without activity until they get some,
+        # rather than all counting as active now
+        migrations.AddField(
+            model_name='article',
+            name='last_activity',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['last_activity'], name='article_activity_idx'),
+        ),
+    ]
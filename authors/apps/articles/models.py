@@ -1,11 +1,50 @@
-from django.db import models
+import math
+import random
+import re
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import (
+    Count, Exists, ExpressionWrapper, F, OuterRef, Q, Subquery
+)
+from django.db.models.functions import Cast, Coalesce, Greatest, Length, Now
 from rest_framework import exceptions
+from django.utils import timezone
 from django.utils.text import slugify
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 from authors.apps.profiles.models import Profile
 from authors.apps.authentication.models import User
+from authors.apps.core.conditional import make_etag
 from authors.apps.core.models import TimeStampedModel
+from . import counters
+
+SEARCH_CONFIG = 'english'
+
+# Weighted document used for full text search over articles
+ARTICLE_SEARCH_VECTOR = (
+    SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+    SearchVector('description', weight='B', config=SEARCH_CONFIG) +
+    SearchVector('body', weight='C', config=SEARCH_CONFIG)
+)
+ARTICLE_SEARCH_FIELDS = {'title', 'description', 'body'}
+
+# Assume a reading speed of 275WPM
+WORDS_PER_MINUTE = 275
+WORD_PATTERN = re.compile(r'\S+')
+READING_FIELDS = {'word_count', 'reading_minutes', 'reading_time'}
+
+# Room left in the slug for a "-<number>" suffix
+SLUG_SUFFIX_LENGTH = 11
+SLUG_ALLOCATION_ATTEMPTS = 10
+
+# Most rows removed by one statement when an article is deleted
+DELETE_BATCH_SIZE = 5000
 
 
 class Article(models.Model):
@@ -27,8 +66,61 @@ class Article(models.Model):
     dislikes = models.PositiveIntegerField(default=0)
     favourite_count = models.PositiveIntegerField(default=0)
     reading_time = models.CharField(max_length=100, null=True)
+    word_count = models.PositiveIntegerField(default=0)
+    reading_minutes = models.PositiveIntegerField(default=0, db_index=True)
     comment_count = models.PositiveIntegerField(default=0)
+    # Average of the ratings, kept in step with their running sum and count
     rating = models.DecimalField(default=0, max_digits=5, decimal_places=2)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    # Number of ratings with each number of stars
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Refreshed periodically by the update_trending_scores command
+    trending_score = models.FloatField(default=0, editable=False)
+    # When the article was published or last got a reaction, rating or
+    # comment. Trending scores decay from it
+    last_activity = models.DateTimeField(
+        default=timezone.now, null=True, editable=False
+    )
+
+    STAR_FIELDS = OrderedDict(
+        (stars, 'stars_{}'.format(stars)) for stars in range(1, 6)
+    )
+
+    # State that, together with the URL, identifies an article representation
+    VALIDATOR_FIELDS = (
+        'id', 'updatedAt', 'likes', 'dislikes', 'favourite_count',
+        'comment_count', 'rating'
+    ) + tuple(STAR_FIELDS.values()) + (
+        'author__updated_at', 'author__user__updated_at'
+    )
+
+    class Meta:
+        indexes = [
+            # Backs the keyset pagination of article listings
+            models.Index(
+                fields=['-createdAt', '-id'], name='article_created_id_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='article_search_idx'),
+            # Lets the trending page read the top scores off the index
+            models.Index(
+                fields=['-trending_score', '-id'], name='article_trending_idx'
+            ),
+            # Finds the recently active articles whose scores are refreshed
+            models.Index(
+                fields=['last_activity'], name='article_activity_idx'
+            ),
+            # Backs reading the feed of followers of popular authors
+            models.Index(
+                fields=['author', '-createdAt', '-id'],
+                name='article_author_created_idx'
+            ),
+        ]
 
     @staticmethod
     def get_article(slug):
@@ -42,6 +134,157 @@ class Article(models.Model):
             raise exceptions.NotFound(message)
         return article
 
+    @staticmethod
+    def annotate_user_state(queryset, user):
+        """Method to add whether a user liked, disliked and favourited each
+        article, and how they rated it, as subqueries of the same query
+        :params queryset user
+        :return queryset"""
+        reactions = Reaction.objects.filter(article=OuterRef('pk'), user=user)
+        annotations = {
+            flag: Exists(reactions.filter(reaction__name=name))
+            for name, flag in Reaction.FLAGS.items()
+        }
+        annotations['my_rating'] = Subquery(Rate.objects.filter(
+            article=OuterRef('pk'), user=user
+        ).values('rating')[:1])
+        return queryset.annotate(**annotations)
+
+    @staticmethod
+    def get_article_detail(slug):
+        """Method to query db for an article together with its author
+        profile, the author's user and the tag names in a single query
+        :params slug
+        :return article"""
+        try:
+            article = Article.objects.select_related(
+                'author__user'
+            ).annotate(
+                tag_names=ArrayAgg(
+                    'tags__tag', distinct=True, filter=Q(tags__isnull=False)
+                )
+            ).get(slug=slug)
+        except Article.DoesNotExist:
+            message = "No article was found"
+            raise exceptions.NotFound(message)
+        return article
+
+    @staticmethod
+    def get_validators(article):
+        """Method to compute the ETag and Last-Modified time of an article
+        :params article loaded with its author and user
+        :return (etag, last_modified)"""
+        counters.apply_pending([article])
+        values = []
+        for field in Article.VALIDATOR_FIELDS:
+            value = article
+            for attribute in field.split('__'):
+                value = getattr(value, attribute, None)
+            values.append(value)
+
+        timestamps = [value for value in values if isinstance(value, datetime)]
+        return make_etag(*values), max(timestamps, default=None)
+
+    @property
+    def rating_histogram(self):
+        """Number of ratings of the article with each number of stars"""
+        return OrderedDict(
+            (str(stars), getattr(self, field))
+            for stars, field in Article.STAR_FIELDS.items()
+        )
+
+    @staticmethod
+    def update_rating(article_id, rating, previous=None):
+        """Method to apply a new or changed rating to the running sum,
+        count, average and star counts of an article in one UPDATE
+        :params article_id rating previous"""
+        rating_sum = F('rating_sum') + rating - (previous or 0)
+        rating_count = F('rating_count') + (0 if previous else 1)
+        changes = {
+            'last_activity': Now(),
+            'rating_sum': rating_sum,
+            'rating_count': rating_count,
+            'rating': ExpressionWrapper(
+                Cast(rating_sum, models.FloatField()) / rating_count,
+                output_field=models.FloatField()
+            ),
+        }
+        if rating != previous:
+            added = Article.STAR_FIELDS[rating]
+            changes[added] = F(added) + 1
+            if previous:
+                removed = Article.STAR_FIELDS[previous]
+                changes[removed] = F(removed) - 1
+        Article.objects.filter(pk=article_id).update(**changes)
+
+    @staticmethod
+    def reconcile_ratings(article_ids=None):
+        """Method to rebuild the rating aggregates of articles from their
+        ratings with one grouped query, for all articles by default
+        :params article_ids
+        :return number of articles updated"""
+        condition = ''
+        params = []
+        if article_ids is not None:
+            condition = 'AND a.id = ANY(%s)'
+            params.append(list(article_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'UPDATE {articles} AS a SET '
+                'rating_sum = coalesce(r.total, 0), '
+                'rating_count = coalesce(r.votes, 0), '
+                'rating = coalesce(r.total::numeric / r.votes, 0), '
+                '{set_stars} '
+                'FROM {articles} AS c LEFT JOIN ('
+                'SELECT article_id, sum(rating) AS total, count(*) AS votes, '
+                '{count_stars} '
+                'FROM {rates} GROUP BY article_id'
+                ') AS r ON r.article_id = c.id '
+                'WHERE a.id = c.id {condition}'.format(
+                    articles=connection.ops.quote_name(Article._meta.db_table),
+                    rates=connection.ops.quote_name(Rate._meta.db_table),
+                    set_stars=', '.join(
+                        '{0} = coalesce(r.{0}, 0)'.format(field)
+                        for field in Article.STAR_FIELDS.values()
+                    ),
+                    count_stars=', '.join(
+                        'count(*) FILTER (WHERE rating = {}) AS {}'.format(
+                            stars, field
+                        ) for stars, field in Article.STAR_FIELDS.items()
+                    ),
+                    condition=condition
+                ),
+                params
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def update_trending_scores(window, gravity):
+        """Method to recompute the trending score of the articles with
+        activity within the window, and to clear the scores of the others
+        :params window gravity
+        :return number of articles scored"""
+        table = connection.ops.quote_name(Article._meta.db_table)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Engagement divided by the hours since the latest activity,
+            # raised to the gravity
+            cursor.execute(
+                'UPDATE {table} SET trending_score = ('
+                'likes - dislikes + 2 * favourite_count + 2 * comment_count'
+                ' + rating) / power('
+                'extract(epoch FROM now() - last_activity) / 3600 + 2, %s) '
+                'WHERE last_activity >= now() - %s'.format(table=table),
+                [gravity, window]
+            )
+            scored = cursor.rowcount
+            cursor.execute(
+                'UPDATE {table} SET trending_score = 0 '
+                'WHERE trending_score <> 0 AND NOT coalesce('
+                'last_activity >= now() - %s, false)'.format(table=table),
+                [window]
+            )
+        return scored
+
     @staticmethod
     def delete_article(user_email, slug):
         """Method to delete article from db
@@ -54,18 +297,74 @@ class Article(models.Model):
         except Article.DoesNotExist:
             message = "You are not authenticated for the action"
             raise exceptions.PermissionDenied(message)
-        return article.delete()
+        return Article.bulk_delete(article.id)
 
     @staticmethod
-    def article_reading_time(body):
-        new_line_words = body.split('\n')
+    def bulk_delete(article_id, batch_size=DELETE_BATCH_SIZE):
+        """Method to delete an article with its comments, reactions, rates,
+        feed items and tag links in one transaction, using set-based
+        statements that each remove at most batch_size rows, instead of
+        loading the related rows to cascade
+        :params article_id batch_size
+        :return total deleted, and the number deleted per model label"""
+        children = [
+            # Replies posted under this article's comments from another one
+            Comment.objects.filter(parent__article_id=article_id),
+            Comment.objects.filter(article_id=article_id),
+            Reaction.objects.filter(article_id=article_id),
+            Rate.objects.filter(article_id=article_id),
+            FeedItem.objects.filter(article_id=article_id),
+            Article.tags.through.objects.filter(article_id=article_id),
+            Article.objects.filter(pk=article_id),
+        ]
+        deleted = OrderedDict()
+        with transaction.atomic():
+            # Rows added for the article meanwhile wait on the lock and then
+            # fail their foreign key check, rather than being left behind
+            list(Article.objects.select_for_update().filter(
+                pk=article_id
+            ).values_list('id'))
+            # Stray replies are counted on their own articles. Their parents
+            # are deleted too, so no thread count needs changing
+            strays = children[0].exclude(article_id=article_id).values(
+                'article_id'
+            ).annotate(count=Count('id')).order_by()
+            for stray in strays:
+                Comment.update_counts(
+                    stray['article_id'], None, -stray['count']
+                )
+            # Replies of this article under other articles' comments are
+            # taken off the thread counts of their parents
+            crossed = Comment.objects.filter(
+                article_id=article_id, parent__isnull=False
+            ).exclude(parent__article_id=article_id).values(
+                'parent_id'
+            ).annotate(count=Count('id')).order_by()
+            for reply in crossed:
+                Comment.objects.filter(pk=reply['parent_id']).update(
+                    thread_count=Greatest(
+                        F('thread_count') - reply['count'], 0
+                    )
+                )
+            for queryset in children:
+                label = queryset.model._meta.label
+                deleted[label] = deleted.get(label, 0) + delete_in_batches(
+                    queryset, batch_size
+                )
+        return sum(deleted.values()), deleted
+
+    @staticmethod
+    def count_words(body):
+        """Count the whitespace separated words of a body in one pass"""
+        return sum(1 for _ in WORD_PATTERN.finditer(body or ''))
 
-        total_words = 0
-        for group in new_line_words:
-            total_words += len(group.split())
+    @staticmethod
+    def reading_minutes_for(word_count):
+        return int(math.ceil(word_count / WORDS_PER_MINUTE))
 
-        # Assume a reading time of 275WPM
-        time_to_read = (total_words/275)
+    @staticmethod
+    def reading_time_for(word_count):
+        time_to_read = (word_count/WORDS_PER_MINUTE)
         if time_to_read < 1:
             return 'Less than a minute'
         elif time_to_read < 2:
@@ -74,6 +373,16 @@ class Article(models.Model):
         # Return a value rounded up or down if below or above 5
         return str(int(round(time_to_read))) + ' minutes'
 
+    @staticmethod
+    def article_reading_time(body):
+        return Article.reading_time_for(Article.count_words(body))
+
+    def set_reading_time(self):
+        """Derive the word count and reading time from the body"""
+        self.word_count = Article.count_words(self.body)
+        self.reading_minutes = Article.reading_minutes_for(self.word_count)
+        self.reading_time = Article.reading_time_for(self.word_count)
+
     @staticmethod
     def get_profile(profile_id):
         return Profile.objects.get(id=profile_id)
@@ -92,29 +401,246 @@ class Article(models.Model):
     def __str__(self):
         return self.title
 
-    def _get_unique_slug(self):
-        slug = slugify(self.title)
-        number = 1
-        while Article.objects.filter(slug=slug).exists():
-            slug = '{}-{}'.format(slug, number)
-            number += 1
-        return slug
+    def _get_unique_slug(self, skip=0):
+        """Return the title slug, suffixed with the next free number when
+        the slug is taken. The highest existing suffix is found in one query:
+        suffixes carry no leading zeros, so the longest slug, then the
+        greatest, holds it. `skip` moves the suffix further along."""
+        max_length = self._meta.get_field('slug').max_length
+        slug = slugify(self.title)[:max_length - SLUG_SUFFIX_LENGTH]
+
+        last_slug = Article.objects.filter(
+            slug__regex=r'^{}(-[0-9]+)?$'.format(re.escape(slug))
+        ).order_by(
+            Length('slug').desc(), '-slug'
+        ).values_list('slug', flat=True).first()
+
+        if last_slug is None and not skip:
+            return slug
+        if last_slug is None or last_slug == slug:
+            number = skip or 1
+        else:
+            number = int(last_slug[len(slug) + 1:]) + 1 + skip
+        return '{}-{}'.format(slug, number)
 
     def save(self, *args, **kwargs):
-        if not self.slug:
-            self.slug = self._get_unique_slug()
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'body' in update_fields:
+            self.set_reading_time()
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | READING_FIELDS
+
+        if self.slug:
+            super().save(*args, **kwargs)
+        else:
+            self._save_with_unique_slug(*args, **kwargs)
+
+        if update_fields is None or ARTICLE_SEARCH_FIELDS & set(update_fields):
+            self.update_search_vector()
+
+    def _save_with_unique_slug(self, *args, **kwargs):
+        """Allocate a slug and save, allocating again if a concurrent save
+        took the same slug first. Retries skip a random, growing number of
+        suffixes so that saves racing for the same title spread out."""
+        for attempt in range(SLUG_ALLOCATION_ATTEMPTS):
+            skip = random.randint(0, 2 ** attempt) if attempt else 0
+            self.slug = self._get_unique_slug(skip)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                slug_taken = Article.objects.filter(slug=self.slug).exists()
+                self.slug = None
+                if not slug_taken or attempt == SLUG_ALLOCATION_ATTEMPTS - 1:
+                    raise
+
+    def update_search_vector(self):
+        """Recompute the stored search document from the article text"""
+        Article.objects.filter(pk=self.pk).update(
+            search_vector=ARTICLE_SEARCH_VECTOR
+        )
+
+
+class FeedItem(models.Model):
+    """
+    An article delivered to the feed of a profile following its author.
+
+    Articles are written into the feeds of followers when they are
+    published, unless the author has more than FEED_FANOUT_LIMIT followers.
+    Articles of those authors are read from the article table instead.
+    """
+    owner = models.ForeignKey(
+        'profiles.Profile', on_delete=models.CASCADE, related_name='feed_items'
+    )
+    article = models.ForeignKey(Article, on_delete=models.CASCADE)
+    # Copy of the article's createdAt so the feed is ordered from this table
+    article_created = models.DateTimeField()
+
+    ORDERING = ('-article_created', '-article_id')
+
+    class Meta:
+        unique_together = ('owner', 'article')
+        indexes = [
+            models.Index(
+                fields=['owner', '-article_created', '-article'],
+                name='feed_owner_created_idx'
+            ),
+        ]
+
+    @staticmethod
+    def fan_out(article):
+        """Method to deliver a new article to the feeds of its author's
+        followers with a single INSERT ... SELECT"""
+        following = Profile.following.through
+        FeedItem._insert_from(
+            'SELECT from_profile_id, %s, %s FROM {following} '
+            'WHERE to_profile_id = %s'.format(
+                following=connection.ops.quote_name(following._meta.db_table)
+            ),
+            [article.id, article.createdAt, article.author_id]
+        )
+
+    @staticmethod
+    def backfill(owner_id, author_ids):
+        """Method to deliver the existing articles of newly followed authors
+        :params owner_id author_ids"""
+        FeedItem._insert_from(
+            'SELECT %s, id, "createdAt" FROM {articles} '
+            'WHERE author_id = ANY(%s)'.format(
+                articles=connection.ops.quote_name(Article._meta.db_table)
+            ),
+            [owner_id, list(author_ids)]
+        )
+
+    @staticmethod
+    def _insert_from(select, params):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {feed} (owner_id, article_id, article_created) '
+                '{select} ON CONFLICT (owner_id, article_id) DO NOTHING'.format(
+                    feed=connection.ops.quote_name(FeedItem._meta.db_table),
+                    select=select
+                ),
+                params
+            )
+
+    @staticmethod
+    def get_feed_keys(profile, position_filter, limit):
+        """Method to get the (createdAt, id) keys of the next articles in
+        the feed of a profile, newest first
+        :params profile position_filter limit
+        :return keys"""
+        delivered = FeedItem.objects.filter(owner=profile)
+        if position_filter is not None:
+            delivered = delivered.filter(position_filter(FeedItem.ORDERING))
+        keys = list(delivered.order_by(*FeedItem.ORDERING).values_list(
+            'article_created', 'article_id'
+        )[:limit])
+
+        # Authors too popular to fan out to are merged in at read time
+        popular_authors = list(profile.following.filter(
+            followers_count__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('id', flat=True))
+        if popular_authors:
+            articles = Article.objects.filter(author_id__in=popular_authors)
+            if position_filter is not None:
+                articles = articles.filter(
+                    position_filter(('-createdAt', '-id'))
+                )
+            keys += articles.order_by('-createdAt', '-id').values_list(
+                'createdAt', 'id'
+            )[:limit]
+
+        # An author who became popular can have articles in both sources
+        return sorted(set(keys), reverse=True)[:limit]
 
 
 class Tag(models.Model):
     """Model for tags """
 
-    tag = models.CharField(max_length=255)
+    tag = models.CharField(max_length=255, unique=True)
     createdAt = models.DateTimeField(auto_now_add=True, null=True)
     updatedAt = models.DateTimeField(auto_now=True, null=True)
 
     def __str__(self):
-        return self.tag  
+        return self.tag
+
+    @staticmethod
+    def resolve_tags(names):
+        """Method to get or create a list of tags in bulk
+        :params names
+        :return tags in the order of their names"""
+        names = [str(name) for name in names]
+        tags = {tag.tag: tag for tag in Tag.objects.filter(tag__in=names)}
+
+        missing = list(OrderedDict.fromkeys(
+            name for name in names if name not in tags
+        ))
+        if missing:
+            # Tags created concurrently by another request are left alone
+            # and picked up by the select below
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO {0} (tag, "createdAt", "updatedAt") '
+                    'SELECT name, now(), now() FROM unnest(%s::varchar[]) '
+                    'AS name ON CONFLICT (tag) DO NOTHING'.format(
+                        connection.ops.quote_name(Tag._meta.db_table)
+                    ),
+                    [missing]
+                )
+            tags.update(
+                (tag.tag, tag) for tag in Tag.objects.filter(tag__in=missing)
+            )
+
+        return [tags[name] for name in names]
+
+
+def insert_or_ignore(model, conflict_fields, **values):
+    """Insert a row in one statement unless it clashes with an existing
+    row on the conflict fields
+    :params model conflict_fields values
+    :return id of the new row, or None if the row already existed"""
+    opts = model._meta
+    columns = [opts.get_field(name).column for name in values]
+    conflict = [opts.get_field(name).column for name in conflict_fields]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({columns}) VALUES ({values}) '
+            'ON CONFLICT ({conflict}) DO NOTHING RETURNING id'.format(
+                table=connection.ops.quote_name(opts.db_table),
+                columns=', '.join(map(connection.ops.quote_name, columns)),
+                values=', '.join(['%s'] * len(columns)),
+                conflict=', '.join(map(connection.ops.quote_name, conflict))
+            ),
+            list(values.values())
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def delete_in_batches(queryset, batch_size):
+    """Delete the rows of a queryset with statements that each remove at
+    most batch_size of them, without loading them or sending signals
+    :params queryset batch_size
+    :return number of rows deleted"""
+    opts = queryset.model._meta
+    batch = queryset.order_by().values('pk')[:batch_size]
+    sql, params = batch.query.sql_with_params()
+    deleted = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(
+                'DELETE FROM {table} WHERE {pk} IN ({batch})'.format(
+                    table=connection.ops.quote_name(opts.db_table),
+                    pk=connection.ops.quote_name(opts.pk.column),
+                    batch=sql
+                ),
+                params
+            )
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                return deleted
 
 
 class Impression(models.Model):
@@ -123,6 +649,48 @@ class Impression(models.Model):
     image = models.URLField(blank=True)
 
 
+class ImpressionRegistry(object):
+    """
+    Process-wide lookup of impressions by name.
+
+    Impressions are a handful of rows that only populate_impression writes,
+    so each worker loads them once and keeps them until an Impression is
+    saved or deleted, which clears the registry through a signal. A name
+    that is not found triggers one reload, for workers that loaded the
+    registry before the table was populated by another process.
+    """
+
+    def __init__(self):
+        self._impressions = None
+
+    def load(self):
+        self._impressions = {
+            impression.name: impression
+            for impression in Impression.objects.all()
+        }
+        return self._impressions
+
+    def get(self, name):
+        """Method to get an impression by name
+        :params name
+        :return impression"""
+        impressions = self._impressions
+        if impressions is None or name not in impressions:
+            impressions = self.load()
+        try:
+            return impressions[name]
+        except KeyError:
+            raise Impression.DoesNotExist(
+                'Impression {!r} does not exist'.format(name)
+            )
+
+    def clear(self):
+        self._impressions = None
+
+
+impression_registry = ImpressionRegistry()
+
+
 class Reaction(models.Model):
     '''
     This model stores the likes,
@@ -138,9 +706,140 @@ class Reaction(models.Model):
         Impression, models.SET_NULL, blank=False, null=True,
     )
 
+    class Meta:
+        unique_together = (('article', 'user', 'reaction'),)
+
+    # Article column counting each kind of reaction
+    COUNTERS = {
+        'Like': 'likes',
+        'Dislike': 'dislikes',
+        'Favourite': 'favourite_count',
+    }
+    # Name of the flag telling whether a user gave each kind of reaction
+    FLAGS = OrderedDict([
+        ('Like', 'liked'),
+        ('Dislike', 'disliked'),
+        ('Favourite', 'favourited'),
+    ])
+    USER_STATE_FIELDS = tuple(FLAGS.values()) + ('my_rating',)
+    # Reactions that exclude each other and can be switched in one request
+    OPPOSITES = {'Like': 'Dislike', 'Dislike': 'Like'}
+
     def __int__(self):
         return self.article_id
 
+    @staticmethod
+    def update_count(article_id, impression, delta):
+        """Method to add delta to the article counter of a reaction
+        :params article_id impression delta"""
+        Reaction.update_counts(
+            article_id, {Reaction.COUNTERS[impression.name]: delta}
+        )
+
+    @staticmethod
+    def update_counts(article_id, deltas):
+        """Method to add deltas to reaction counters of an article with one
+        UPDATE, so concurrent reactions cannot overwrite each other.
+        When counters are buffered the deltas are queued once the
+        transaction commits instead
+        :params article_id deltas mapping counter fields to changes"""
+        if counters.is_enabled():
+            def queue():
+                for field, delta in deltas.items():
+                    counters.add(article_id, field, delta)
+            transaction.on_commit(queue)
+            return
+        changes = {
+            field: F(field) + delta for field, delta in deltas.items()
+        }
+        if any(delta > 0 for delta in deltas.values()):
+            changes['last_activity'] = Now()
+        Article.objects.filter(pk=article_id).update(**changes)
+
+    @staticmethod
+    def get_counts(article_id):
+        """Method to get the current reaction counters of an article
+        :params article_id
+        :return {counter field: value}"""
+        article = Article.objects.only(
+            *Reaction.COUNTERS.values()
+        ).get(pk=article_id)
+        counters.apply_pending([article])
+        return OrderedDict(
+            (field, getattr(article, field))
+            for field in Reaction.COUNTERS.values()
+        )
+
+    @staticmethod
+    def recount(article_ids):
+        """Method to recompute the reaction counters of articles from the
+        stored reactions
+        :params article_ids"""
+        counts = Reaction.objects.filter(article=OuterRef('pk')).values(
+            'article'
+        ).annotate(count=Count('id')).values('count')
+        Article.objects.filter(id__in=article_ids).update(**{
+            field: Coalesce(
+                Subquery(counts.filter(reaction__name=name)), 0
+            )
+            for name, field in Reaction.COUNTERS.items()
+        })
+
+    @staticmethod
+    def add(user, article, impression):
+        """Method to store a reaction and count it in one transaction
+        :params user article impression
+        :return reaction, or None if the user had already reacted"""
+        with transaction.atomic():
+            pk = insert_or_ignore(
+                Reaction, ('article', 'user', 'reaction'),
+                article=article.id, user=user.id, reaction=impression.id
+            )
+            if pk is None:
+                return None
+            Reaction.update_count(article.id, impression, 1)
+        return Reaction(
+            pk=pk, user=user, article=article, reaction=impression
+        )
+
+    @staticmethod
+    def switch(user, article, impression):
+        """Method to turn the opposite reaction of a user to an article into
+        the given one, moving the count between both counters, or to add
+        the reaction if there is nothing to switch, in one transaction
+        :params user article impression
+        :return whether the reaction was switched or added"""
+        opposite = impression_registry.get(Reaction.OPPOSITES[impression.name])
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    switched = Reaction.objects.filter(
+                        user=user, article=article, reaction=opposite
+                    ).update(reaction=impression)
+            except IntegrityError:
+                # The user has already given both reactions
+                return False
+            if not switched:
+                return Reaction.add(user, article, impression) is not None
+            Reaction.update_counts(article.id, {
+                Reaction.COUNTERS[opposite.name]: -switched,
+                Reaction.COUNTERS[impression.name]: switched,
+            })
+        return True
+
+    @staticmethod
+    def remove(user, article, impression):
+        """Method to delete a reaction and uncount it in one transaction
+        :params user article impression
+        :return whether the user had reacted"""
+        with transaction.atomic():
+            deleted, _ = Reaction.objects.filter(
+                user=user, article=article, reaction=impression
+            ).delete()
+            if deleted:
+                Reaction.update_count(article.id, impression, -deleted)
+        return bool(deleted)
+
 
 class Comment(TimeStampedModel):
     """Model for comments on articles"""
@@ -150,53 +849,94 @@ class Comment(TimeStampedModel):
         on_delete=models.CASCADE,
         null=True
     )
-    author_name = models.TextField(null=True)
     article = models.ForeignKey(
         'articles.Article',
         on_delete=models.CASCADE,
         null=True
     )
-    parent = models.TextField(null=True, blank=True)
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='replies',
+        db_index=False
+    )
     thread_count = models.PositiveIntegerField(default=0)
 
+    class Meta(TimeStampedModel.Meta):
+        # Pages of comments and of threads, in the order they were posted,
+        # are read from one range of these. Top-level comments are found
+        # by scanning the article's comments, since `parent IS NULL` does
+        # not let a (article, parent, created_at) index return them sorted
+        indexes = [
+            models.Index(
+                fields=['article', 'created_at', 'id'],
+                name='comment_article_created_idx'
+            ),
+            models.Index(
+                fields=['parent', 'created_at', 'id'],
+                name='comment_parent_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.body
 
     @staticmethod
-    def comment_article(count, slug_param):
-        article = Article.get_article(slug=slug_param)
-        article.__dict__.update(comment_count=count)
-        article.save()
-
-    def get_count(self, slug):
-        self.slug = slug
-        article = Article.objects.get(slug=self.slug)
-        return article.comment_count
-    
-    @staticmethod
-    def thread_comment(count, id_param):
-        comment = Comment.objects.get(id=id_param)
-        comment.__dict__.update(thread_count=count)
-        comment.save()
-    
-    def get_thread_count(self, id):
-        self.id = id
-        comment = Comment.objects.get(id=self.id)
-        return comment.thread_count
-    
-    @staticmethod
-    def thread_comment_delete(count, id_param):
-        comment = Comment.objects.get(id=id_param)
-        parent_comment = Comment.objects.get(id=comment.parent)
-        parent_comment.__dict__.update(thread_count=count)
-        parent_comment.save()
-    
-    def get_thread_count_delete(self, id):
-        self.id = id
-        comment = Comment.objects.get(id=self.id)
-        parent_comment = Comment.objects.get(id=comment.parent)
-        # import pdb; pdb.set_trace()
-        return parent_comment.thread_count
+    def update_counts(article_id, parent_id, delta):
+        """Method to add delta to the comment count of an article and, for
+        a reply, to the thread count of its parent comment, changing only
+        those columns
+        :params article_id parent_id delta"""
+        changes = {'comment_count': Greatest(F('comment_count') + delta, 0)}
+        if delta > 0:
+            changes['last_activity'] = Now()
+        Article.objects.filter(pk=article_id).update(**changes)
+        if parent_id is not None:
+            Comment.objects.filter(pk=parent_id).update(
+                thread_count=Greatest(F('thread_count') + delta, 0)
+            )
+
+    @staticmethod
+    def get_tree(slug, root_id=None, max_depth=None):
+        """Method to load the comments of an article with one ordered query
+        and nest them under their parents in linear time
+        :params slug root_id max_depth
+        :return the top-level comments, or the comment root_id, each with
+        its replies in `tree_replies` down to max_depth levels"""
+        comments = list(
+            Comment.objects.select_related('author__user').filter(
+                article__slug=slug
+            ).order_by('id')
+        )
+        by_id = {}
+        for comment in comments:
+            comment.tree_replies = []
+            by_id[comment.id] = comment
+
+        roots = []
+        for comment in comments:
+            if comment.parent_id is None:
+                roots.append(comment)
+            elif comment.parent_id in by_id:
+                by_id[comment.parent_id].tree_replies.append(comment)
+
+        if root_id is not None:
+            if root_id not in by_id:
+                raise Comment.DoesNotExist
+            roots = [by_id[root_id]]
+
+        if max_depth is not None:
+            level = roots
+            for _ in range(max_depth - 1):
+                level = [
+                    reply for comment in level
+                    for reply in comment.tree_replies
+                ]
+            for comment in level:
+                comment.tree_replies = []
+        return roots
 
 
 class Rate(models.Model):
@@ -209,3 +949,37 @@ class Rate(models.Model):
     rating = models.IntegerField(
         default=0, validators=[MinValueValidator(1), MaxValueValidator(5)]
         )
+
+    class Meta:
+        unique_together = (('article', 'user'),)
+
+    @staticmethod
+    def set_rating(user, article, rating):
+        """Method to store or change the rating of a user for an article and
+        apply the difference to the article aggregates in one transaction
+        :params user article rating
+        :return rate, previous rating or None if the article was unrated"""
+        with transaction.atomic():
+            # A concurrent first vote can win the insert, in which case the
+            # second pass finds and locks its row
+            for _ in range(2):
+                existing = Rate.objects.select_for_update().filter(
+                    article=article, user=user
+                ).values_list('id', 'rating').first()
+                if existing:
+                    pk, previous = existing
+                    Rate.objects.filter(pk=pk).update(rating=rating)
+                    Article.update_rating(article.id, rating, previous)
+                    break
+                pk = insert_or_ignore(
+                    Rate, ('article', 'user'),
+                    article=article.id, user=user.id, rating=rating
+                )
+                if pk is not None:
+                    previous = None
+                    Article.update_rating(article.id, rating)
+                    break
+            else:
+                # The conflicting row was deleted before it could be locked
+                raise IntegrityError('The rating changed concurrently')
+        return Rate(pk=pk, user=user, article=article, rating=rating), previous
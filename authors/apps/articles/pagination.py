@@ -0,0 +1,36 @@
+from authors.apps.core.pagination import KeysetPagination
+from .models import FeedItem
+
+
+class ArticleKeysetPagination(KeysetPagination):
+    """Cursor pagination over articles, newest first"""
+    ordering = ('-createdAt', '-id')
+
+
+class CommentKeysetPagination(KeysetPagination):
+    """Cursor pagination over comments, in the order they were posted"""
+    ordering = ('created_at', 'id')
+
+
+class FeedPagination(ArticleKeysetPagination):
+    """Cursor pagination over the feed of the requesting user"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        position_filter = None
+        if position is not None:
+            def position_filter(ordering):
+                return self.get_position_filter(*position, ordering=ordering)
+
+        keys = FeedItem.get_feed_keys(
+            request.user.profile, position_filter, self.page_size + 1
+        )
+        self.has_next = len(keys) > self.page_size
+        ids = [pk for _, pk in keys[:self.page_size]]
+
+        articles = queryset.in_bulk(ids)
+        self.page = [articles[pk] for pk in ids if pk in articles]
+        return self.page
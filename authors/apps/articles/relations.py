@@ -1,14 +1,36 @@
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 
 from .models import Tag
 
+
+class TagListRelatedField(serializers.ManyRelatedField):
+    """Class for a list of tags, resolved together"""
+
+    def to_internal_value(self, data):
+        """Resolve the whole tag list in bulk instead of tag by tag"""
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        return Tag.resolve_tags(data)
+
+
 class TagRelatedField(serializers.RelatedField):
     """Class for Tag RelatedField"""
 
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return TagListRelatedField(**list_kwargs)
+
     def to_internal_value(self, data):
         """To implement a read-write relational field"""
-        tag, created = Tag.objects.get_or_create(tag=data)
-        return tag
+        return Tag.resolve_tags([data])[0]
 
     def to_representation(self, value):
         """Override the RelationField """
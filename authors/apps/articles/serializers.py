@@ -8,13 +8,31 @@ from .models import (
     Tag,
     Rate,
     Reaction,
-    Impression, 
     Comment
 )
+from . import counters
 from .relations import TagRelatedField
+from authors.apps.profiles.serializers import ProfileListSerializer
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class PendingCountersListSerializer(serializers.ListSerializer):
+    """Adds the buffered reaction counts of all the articles in one go"""
+
+    def to_representation(self, data):
+        articles = list(data.all() if hasattr(data, 'all') else data)
+        counters.apply_pending(articles)
+        return super().to_representation(articles)
+
+
+class PendingCountersMixin(object):
+    """Serializes articles with their buffered reaction counts added"""
+
+    def to_representation(self, instance):
+        counters.apply_pending([instance])
+        return super().to_representation(instance)
+
+
+class ArticleSerializer(PendingCountersMixin, serializers.ModelSerializer):
     """Create a new article"""
 
     tagList = TagRelatedField(many=True, required=False, queryset=Tag.objects.all(), source='tags')
@@ -24,18 +42,66 @@ class ArticleSerializer(serializers.ModelSerializer):
         fields = [
             'author', 'title', 'description', 'body',
             'createdAt', 'updatedAt', 'slug', 'favourite_count',
-            'likes', 'dislikes', 'tagList', 'reading_time', 'comment_count', 'rating'
+            'likes', 'dislikes', 'tagList', 'reading_time', 'word_count',
+            'reading_minutes', 'comment_count', 'rating'
         ]
+        read_only_fields = ['reading_time', 'word_count', 'reading_minutes']
+        list_serializer_class = PendingCountersListSerializer
 
     def create(self, validated_data):
         author = self.context.get('author', None)
         tags_data = validated_data.pop('tags', [])
         article = Article.objects.create(author=author, **validated_data)
-        for tag in tags_data:
-            article.tags.add(tag)
+        article.tags.add(*tags_data)
         return article
 
 
+class ArticleListSerializer(ArticleSerializer):
+    """Article representation for listings, embedding the author.
+    Expects the queryset to select the author's user and prefetch tags"""
+
+    author = ProfileListSerializer(read_only=True)
+
+
+class ArticleUserStateListSerializer(ArticleListSerializer):
+    """Article representation for listings that also tells how the
+    requesting user reacted to and rated each article.
+    Expects the queryset to come from `Article.annotate_user_state`"""
+
+    liked = serializers.BooleanField(read_only=True)
+    disliked = serializers.BooleanField(read_only=True)
+    favourited = serializers.BooleanField(read_only=True)
+    my_rating = serializers.IntegerField(read_only=True)
+
+    class Meta(ArticleListSerializer.Meta):
+        fields = ArticleListSerializer.Meta.fields + list(
+            Reaction.USER_STATE_FIELDS
+        )
+
+
+class ArticleDetailSerializer(PendingCountersMixin,
+                              serializers.ModelSerializer):
+    """Read-only representation of a single article.
+    Expects an article from `Article.get_article_detail` so that the
+    author and tags are already loaded"""
+
+    author = ProfileListSerializer(read_only=True)
+    fav_count = serializers.IntegerField(source='favourite_count')
+    tagList = serializers.ListField(source='tag_names')
+    rating_histogram = serializers.DictField(read_only=True)
+
+    class Meta:
+        model = Article
+        fields = [
+            'author', 'title', 'description', 'body',
+            'createdAt', 'updatedAt', 'slug', 'fav_count',
+            'likes', 'dislikes', 'tagList', 'reading_time', 'word_count',
+            'reading_minutes', 'comment_count', 'rating', 'rating_count',
+            'rating_histogram'
+        ]
+        read_only_fields = fields
+
+
 class TagSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -46,92 +112,58 @@ class TagSerializer(serializers.ModelSerializer):
         return value.tag
 
 
+class TagCloudSerializer(serializers.ModelSerializer):
+    """Tag with the number of articles using it"""
+
+    article_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Tag
+        fields = ('tag', 'article_count')
+
+
 class ReactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reaction
         fields = ['article', 'user', 'reaction']
+        read_only_fields = ['article', 'user', 'reaction']
 
-    @staticmethod
-    def reaction_value(reaction, article_slug, article, reaction_integer):
-        react_id = 0
-
-        if reaction == Impression.objects.get(name='Like').id:
-            react_id = 1
-            updated_likes = article.likes + reaction_integer
-            Article.objects.filter(slug=article_slug).update(
-                likes=updated_likes
-            )
-        elif reaction == Impression.objects.get(name='Dislike').id:
-            react_id = 2
-            updated_dislikes = article.dislikes + reaction_integer
-            Article.objects.filter(slug=article_slug).update(
-                dislikes=updated_dislikes
-            )
-        elif reaction == Impression.objects.get(name='Favourite').id:
-            react_id = 3
-            updated_favourites = article.favourite_count + reaction_integer
-            Article.objects.filter(slug=article_slug).update(
-                favourite_count=updated_favourites
-            )
-        else:
+    def validate(self, data):
+        reaction = self.context.get('reaction')
+        if reaction.name not in Reaction.COUNTERS:
             message = 'You have entered invalid data.'
             raise exceptions.PermissionDenied(message)
-        return react_id
-
-    def validate(self, data):
-        try:
-            current_reaction = Reaction.objects.get(
-                article=data.get('article'),
-                user=data.get('user'),
-                reaction=data.get('reaction')
-            )
-            if isinstance(current_reaction, object):
-                message = 'You have already {}d this article.'.format(
-                    data.get('reaction').name
-                )
-                raise exceptions.ParseError(message)
-        except Reaction.DoesNotExist:
-            article = data.get('article')
-            reaction = data.get('reaction').id
-            react_id = ReactionSerializer.reaction_value(
-                reaction, article.slug, article, 1
-            )
-            if reaction == Impression.objects.get(name='Like').id:
-                react_id = 1
-                updated_likes = article.likes + 1
-                Article.objects.filter(slug=article.slug).update(
-                    likes=updated_likes
-                )
-            elif reaction == Impression.objects.get(name='Dislike').id:
-                react_id = 2
-                updated_dislikes = article.dislikes + 1
-                Article.objects.filter(slug=article.slug).update(
-                    dislikes=updated_dislikes
-                )
-            elif reaction == Impression.objects.get(name='Favourite').id:
-                react_id = 3
-                updated_favourites = article.favourite_count + 1
-                Article.objects.filter(slug=article.slug).update(
-                    favourite_count=updated_favourites
-                )
-            else:
-                message = 'You have entered invalid data.'
-                raise exceptions.PermissionDenied(message)
-            return {
-                'article': data.get('article'),
-                'reaction': react_id,
-                'user': data.get('user')
-            }
+        return data
 
     def create(self, validated_data):
         user = self.context.get('user', None)
         article = self.context.get('article', None)
         reaction = self.context.get('reaction', None)
-        return Reaction.objects.create(
-            user=user, article=article, reaction=reaction)
+        instance = Reaction.add(user, article, reaction)
+        if instance is None:
+            message = 'You have already {}d this article.'.format(
+                reaction.name
+            )
+            raise exceptions.ParseError(message)
+        return instance
+
+
+class CommentAuthorSerializer(ProfileListSerializer):
+    """The author of a comment, read from the profile and user that are
+    selected along with the comment"""
+
+    class Meta(ProfileListSerializer.Meta):
+        fields = ('username', 'avatar')
 
 
 class CommentSerializer(serializers.ModelSerializer):
+    author = CommentAuthorSerializer(read_only=True)
+    # The current username of the author, under the name clients know it by
+    author_name = serializers.CharField(
+        source='author.user.username', read_only=True
+    )
+    # The id of the parent comment, rendered as a string as it always was
+    parent = serializers.CharField(source='parent_id', read_only=True)
 
     class Meta:
         model = Comment
@@ -141,13 +173,11 @@ class CommentSerializer(serializers.ModelSerializer):
         ]
 
     def create(self, validated_data):
-        author_name = self.context.get('author_name', None)
         author = self.context.get('author', None)
         article = self.context.get('article', None)
         parent = self.context.get('parent', None)
 
         return Comment.objects.create(
-            author_name=author_name,
             author=author,
             article=article,
             parent=parent,
@@ -155,35 +185,16 @@ class CommentSerializer(serializers.ModelSerializer):
         )
 
 
-class CommentCreateSerializer(serializers.ModelSerializer):
-    author_name = serializers.SerializerMethodField()
-
-    def get_author_name(self, field):
-        request = self.context.get('author', None)
-
-        profile = request.user.profile
-        return profile.user.username
+class CommentTreeSerializer(CommentSerializer):
+    """Comment representation nesting the replies from `Comment.get_tree`"""
 
-    class Meta:
-        model = Comment
-        fields = [
-            'id', 'author', 'author_name', 'article', 'body',
-            'parent', 'created_at', 'updated_at', 'thread_count'
-        ]
+    replies = serializers.SerializerMethodField()
 
-    def create(self, validated_data):
-        author_name = self.get_author_name('author')
-        author = self.context.get('author', None)
-        article = self.context.get('article', None)
-        parent = self.context.get('parent', None)
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['replies']
 
-        return Comment.objects.create(
-            author=author,
-            author_name=author_name,
-            article=article,
-            parent=parent,
-            **validated_data
-        )
+    def get_replies(self, comment):
+        return CommentTreeSerializer(comment.tree_replies, many=True).data
 
 
 class ShareArticleSerializer(serializers.Serializer):
@@ -193,20 +204,11 @@ class RateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rate
         fields = ['user', 'article', 'rating']
+        # A second rating from the same user replaces the first one
+        validators = []
 
     def create(self, validated_data):
         user = self.context.get('user', None)
         article = self.context.get('article', None)
-        rate = self.context.get('rating', None)
-        return Rate.objects.create(user=user, article=article, rating=rate)
-
-    def validate(self, data):
-        try:
-            Rate.objects.get(
-                user=data.get('user'),
-                article=data.get('article')
-            )
-
-        except Rate.DoesNotExist:
-            return data
-        raise exceptions.PermissionDenied()
+        instance, _ = Rate.set_rating(user, article, validated_data['rating'])
+        return instance
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from authors.apps.profiles.models import Profile
+from .models import Article, FeedItem, Impression, impression_registry
+
+
+@receiver(post_save, sender=Article)
+def fan_out_article(sender, instance, created, *args, **kwargs):
+    """
+    Method to deliver a new article to the feeds of its author's followers.
+    Articles of authors with more than FEED_FANOUT_LIMIT followers are not
+    delivered; the feed reads them from the article table.
+    """
+    if not created or instance.author_id is None:
+        return
+    followers_count = Profile.objects.filter(
+        pk=instance.author_id
+    ).values_list('followers_count', flat=True).first()
+    if followers_count and followers_count <= settings.FEED_FANOUT_LIMIT:
+        FeedItem.fan_out(instance)
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def update_feed_on_follow(sender, instance, action, reverse, pk_set,
+                          *args, **kwargs):
+    """
+    Method to add the articles of newly followed authors to a feed, and to
+    remove the articles of authors that were unfollowed
+    """
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+
+    if reverse:
+        pairs = [(follower, [instance.pk]) for follower in pk_set]
+    else:
+        pairs = [(instance.pk, list(pk_set))]
+
+    for owner_id, author_ids in pairs:
+        if action == 'post_add':
+            FeedItem.backfill(owner_id, Profile.objects.filter(
+                pk__in=author_ids,
+                followers_count__lte=settings.FEED_FANOUT_LIMIT
+            ).values_list('id', flat=True))
+        else:
+            FeedItem.objects.filter(
+                owner_id=owner_id, article__author_id__in=author_ids
+            ).delete()
+
+
+@receiver(post_save, sender=Impression)
+@receiver(post_delete, sender=Impression)
+def clear_impression_registry(sender, *args, **kwargs):
+    """Method to drop the cached impressions when one of them changes"""
+    impression_registry.clear()
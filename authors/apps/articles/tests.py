@@ -1,18 +1,40 @@
+import logging
+import time
+from datetime import timedelta
 from io import StringIO
+from unittest import mock
 
 from django.core.management import call_command
-from django.test import TestCase
+from django.core.cache import cache, caches
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
 from rest_framework import status
 from rest_framework.test import APIClient
 
 from authors.apps.authentication.models import User
+from authors.apps.core.testing import (
+    MigrationTestCase, benchmark, run_concurrently
+)
 from authors.apps.profiles.models import Profile
+from . import counters
 from .models import (
     Article,
     Impression,
     Reaction,
-    Rate
+    Rate,
+    Tag,
+    Comment,
+    FeedItem,
+    impression_registry
 )
+from .pagination import CommentKeysetPagination
+from .views import CommentListCreateAPIView
+
+logger = logging.getLogger(__name__)
 
 
 class ViewTest(TestCase):
@@ -155,6 +177,661 @@ class ViewTest(TestCase):
         self.assertEqual(result.status_code, status.HTTP_200_OK)
 
 
+class ArticleDetailQueryTest(TestCase):
+    """Pin the number of queries used to read a single article"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="red", email="red@gmail.com", password="password"
+        )
+        self.article = Article.objects.create(
+            title="Test article",
+            description="description of test article",
+            body="this is the body of test article",
+            author=Profile.objects.get(user=self.user)
+        )
+        for name in ["dragons", "training"]:
+            self.article.tags.add(Tag.objects.create(tag=name))
+        self.client = APIClient()
+
+    def test_article_detail_runs_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/articles/test-article/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_article_detail_embeds_author_and_tags(self):
+        response = self.client.get('/api/articles/test-article/')
+        article = response.data['article']
+        self.assertEqual(article['author']['username'], "red")
+        self.assertEqual(sorted(article['tagList']), ["dragons", "training"])
+        self.assertEqual(article['fav_count'], 0)
+        self.assertEqual(response.data['message'], "Success")
+
+    def test_article_detail_without_tags(self):
+        self.article.tags.clear()
+        response = self.client.get('/api/articles/test-article/')
+        self.assertEqual(response.data['article']['tagList'], [])
+
+
+class ArticleKeysetPaginationTest(TestCase):
+    """Tests for cursor pagination of the article listings"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="red", email="red@gmail.com", password="password"
+        )
+        self.profile = Profile.objects.get(user=self.user)
+        for number in range(7):
+            Article.objects.create(
+                title="article {}".format(number),
+                description="description",
+                body="body",
+                author=self.profile
+            )
+        # Give some articles the same timestamp to exercise the id tiebreak
+        tied = Article.objects.order_by('id')[:3]
+        Article.objects.filter(id__in=[a.id for a in tied]).update(
+            createdAt=tied[0].createdAt
+        )
+        self.client = APIClient()
+
+    def walk_pages(self, url):
+        slugs = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            slugs.extend(a['slug'] for a in response.data['results'])
+            url = response.data['next']
+        return slugs
+
+    def test_pages_cover_all_articles_in_order(self):
+        slugs = self.walk_pages('/api/article/?limit=2')
+        expected = list(Article.objects.order_by(
+            '-createdAt', '-id'
+        ).values_list('slug', flat=True))
+        self.assertEqual(slugs, expected)
+
+    def test_pages_do_not_count_rows(self):
+        first = self.client.get('/api/article/?limit=2')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first.data['next'])
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries.captured_queries)
+        )
+
+    def test_deep_page_costs_the_same_as_first_page(self):
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get('/api/article/?limit=2')
+        for _ in range(2):
+            response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as deep_page:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(first_page), len(deep_page))
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/article/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_my_articles_are_paginated(self):
+        self.client.force_authenticate(user=self.user)
+        slugs = self.walk_pages('/api/article/my-articles/?limit=3')
+        self.assertEqual(len(slugs), 7)
+
+
+class ArticleListQueryBenchmark(TestCase):
+    """Article listings must not run a query per article"""
+
+    def setUp(self):
+        self.client = APIClient()
+        tags = [Tag.objects.create(tag='tag{}'.format(n)) for n in range(3)]
+        for number in range(100):
+            user = User.objects.create_user(
+                username="user{}".format(number),
+                email="user{}@gmail.com".format(number)
+            )
+            article = Article.objects.create(
+                title="article {}".format(number),
+                description="description",
+                body="body",
+                author=Profile.objects.get(user=user)
+            )
+            article.tags.add(*tags)
+
+    def test_list_page_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as small_page:
+            self.client.get('/api/article/?limit=10')
+        with CaptureQueriesContext(connection) as large_page:
+            response = self.client.get('/api/article/?limit=100')
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertEqual(len(small_page), len(large_page))
+        # One query for the page validators, one for articles joined to
+        # authors and one for all their tags
+        self.assertEqual(len(large_page), 3)
+
+    def test_list_embeds_author_and_tags(self):
+        response = self.client.get('/api/article/?limit=1')
+        article = response.data['results'][0]
+        self.assertEqual(article['author']['username'], 'user99')
+        self.assertIn('avatar', article['author'])
+        self.assertEqual(len(article['tagList']), 3)
+
+
+class ArticleSearchTest(TestCase):
+    """Tests for full text search over articles"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="red", email="red@gmail.com"
+        )
+        self.other_user = User.objects.create_user(
+            username="blue", email="blue@gmail.com"
+        )
+        self.in_body = Article.objects.create(
+            title="Cooking at home",
+            description="Simple meals",
+            body="Dragons are not needed to cook rice",
+            author=Profile.objects.get(user=self.user)
+        )
+        self.in_title = Article.objects.create(
+            title="How to train your dragon",
+            description="Ever wonder how?",
+            body="It takes patience",
+            author=Profile.objects.get(user=self.other_user)
+        )
+        self.in_title.tags.add(Tag.objects.create(tag='training'))
+        Article.objects.create(
+            title="Unrelated", description="Nothing", body="Nothing at all"
+        )
+
+    def search(self, params):
+        response = self.client.get('/api/article/search/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [article['slug'] for article in response.data['results']]
+
+    def test_results_are_ranked(self):
+        self.assertEqual(
+            self.search({'q': 'dragons'}),
+            [self.in_title.slug, self.in_body.slug]
+        )
+
+    def test_filter_by_tag(self):
+        self.assertEqual(
+            self.search({'q': 'dragon', 'tag': 'training'}),
+            [self.in_title.slug]
+        )
+
+    def test_filter_by_author(self):
+        self.assertEqual(
+            self.search({'q': 'dragon', 'author': 'red'}),
+            [self.in_body.slug]
+        )
+
+    def test_search_vector_follows_updates(self):
+        self.in_body.body = "Rice only"
+        self.in_body.save()
+        self.assertEqual(self.search({'q': 'dragon'}), [self.in_title.slug])
+
+    def test_search_requires_query(self):
+        response = self.client.get('/api/article/search/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_populate_search_vector_command(self):
+        Article.objects.update(search_vector=None)
+        out = StringIO()
+        call_command('populate_search_vector', batch_size=2, stdout=out)
+        self.assertIn('populated for 3 articles', out.getvalue())
+        self.assertEqual(len(self.search({'q': 'dragon'})), 2)
+
+
+class UniqueSlugTest(TestCase):
+    """Tests for slug allocation on article creation"""
+
+    def create_article(self, title="Same title"):
+        return Article.objects.create(
+            title=title, description="description", body="body"
+        )
+
+    def test_same_titles_get_numbered_slugs(self):
+        slugs = [self.create_article().slug for _ in range(4)]
+        self.assertEqual(
+            slugs, ['same-title', 'same-title-1', 'same-title-2', 'same-title-3']
+        )
+
+    def test_suffix_is_numeric_not_lexical(self):
+        for _ in range(11):
+            self.create_article()
+        self.assertEqual(self.create_article().slug, 'same-title-11')
+
+    def test_similar_titles_do_not_clash(self):
+        self.create_article()
+        self.assertEqual(
+            self.create_article("Same title extra").slug, 'same-title-extra'
+        )
+
+    def test_allocation_is_a_single_query(self):
+        for _ in range(20):
+            self.create_article()
+        article = Article(title="Same title", description="d", body="b")
+        with self.assertNumQueries(1):
+            slug = article._get_unique_slug()
+        self.assertEqual(slug, 'same-title-20')
+
+    def test_long_titles_leave_room_for_suffix(self):
+        self.create_article("a" * 150)
+        article = self.create_article("a" * 150)
+        self.assertLessEqual(len(article.slug), 140)
+        self.assertTrue(article.slug.endswith('-1'))
+
+
+@benchmark
+class ConcurrentSlugBenchmark(TransactionTestCase):
+    """Create many same titled articles from concurrent threads"""
+    threads = 8
+    articles_per_thread = 250
+
+    def create_articles(self):
+        for _ in range(self.articles_per_thread):
+            Article.objects.create(
+                title="Popular title", description="d", body="b"
+            )
+
+    def test_concurrent_creates_get_unique_slugs(self):
+        errors, elapsed = run_concurrently(
+            self.create_articles, [()] * self.threads
+        )
+        self.assertEqual(errors, [])
+
+        total = self.threads * self.articles_per_thread
+        slugs = set(Article.objects.values_list('slug', flat=True))
+        self.assertEqual(len(slugs), total)
+        self.assertEqual(Article.objects.count(), total)
+        logger.debug(
+            '%s concurrent article creates took %.2fs', total, elapsed
+        )
+
+
+class ConditionalGetTest(TestCase):
+    """Tests for ETag and Last-Modified handling on article endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="red", email="red@gmail.com"
+        )
+        self.article = Article.objects.create(
+            title="Test article", description="d", body="b",
+            author=Profile.objects.get(user=self.user)
+        )
+        self.comment = Comment.objects.create(
+            body="first", article=self.article,
+            author=Profile.objects.get(user=self.user)
+        )
+
+    def assert_revalidates(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('ETag', response)
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(cached.content, b'')
+        return response['ETag']
+
+    def test_article_detail_not_modified(self):
+        etag = self.assert_revalidates('/api/articles/test-article/')
+        Article.objects.filter(id=self.article.id).update(likes=1)
+        response = self.client.get(
+            '/api/articles/test-article/', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_article_detail_validation_uses_one_query(self):
+        response = self.client.get('/api/articles/test-article/')
+        with self.assertNumQueries(1):
+            self.client.get(
+                '/api/articles/test-article/',
+                HTTP_IF_NONE_MATCH=response['ETag']
+            )
+
+    def test_article_detail_last_modified(self):
+        response = self.client.get('/api/articles/test-article/')
+        self.assertIn('Last-Modified', response)
+
+    def test_article_list_not_modified(self):
+        etag = self.assert_revalidates('/api/article/')
+        Article.objects.create(title="Another", description="d", body="b")
+        response = self.client.get('/api/article/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_comment_listings_not_modified(self):
+        self.client.force_authenticate(user=self.user)
+        comments_url = '/api/articles/test-article/comments/'
+        etag = self.assert_revalidates(comments_url)
+        self.assert_revalidates(
+            '/api/articles/test-article/comments/{}/thread/'.format(
+                self.comment.id
+            )
+        )
+        self.comment.delete()
+        response = self.client.get(comments_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class TagTest(TestCase):
+    """Tests for tag uniqueness, bulk resolution and the tag cloud"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="red", email="red@gmail.com"
+        )
+        self.client.force_authenticate(user=self.user)
+        Tag.objects.create(tag='dragons')
+
+    def create_article(self, tags):
+        return self.client.post('/api/articles/', {'article': {
+            'title': 'tagged', 'description': 'd', 'body': 'b', 'tagList': tags
+        }}, format="json")
+
+    def test_tag_names_are_unique(self):
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                Tag.objects.create(tag='dragons')
+
+    def test_resolve_tags_in_bulk(self):
+        with self.assertNumQueries(3):
+            tags = Tag.resolve_tags(['training', 'dragons', 'fire', 'training'])
+        self.assertEqual(
+            [tag.tag for tag in tags], ['training', 'dragons', 'fire', 'training']
+        )
+        self.assertEqual(Tag.objects.count(), 3)
+        with self.assertNumQueries(1):
+            Tag.resolve_tags(['training', 'dragons', 'fire'])
+
+    def test_article_reuses_existing_tags(self):
+        response = self.create_article(['dragons', 'fire'])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.filter(tag='dragons').count(), 1)
+        self.assertEqual(
+            sorted(response.data['article']['tagList']), ['dragons', 'fire']
+        )
+
+    def test_tag_cloud_counts_articles(self):
+        self.create_article(['dragons', 'fire'])
+        self.create_article(['dragons'])
+        Tag.objects.create(tag='unused')
+        response = self.client.get('/api/tags/cloud/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [(tag['tag'], tag['article_count'])
+             for tag in response.data['results']],
+            [('dragons', 2), ('fire', 1)]
+        )
+
+    def test_tag_cloud_is_cached(self):
+        self.create_article(['dragons'])
+        self.client.force_authenticate(user=None)
+        self.client.get('/api/tags/cloud/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tags/cloud/')
+        self.assertEqual(response.data['results'][0]['tag'], 'dragons')
+
+
+class TagMigrationTest(MigrationTestCase):
+    """Tests for merging duplicate tags before tag names become unique"""
+
+    app = 'articles'
+    migrate_from = '0004_article_reading_time'
+    migrate_to = '0005_unique_tag_names'
+
+    def test_duplicate_tags_are_merged(self):
+        Tag = self.apps.get_model('articles', 'Tag')
+        Article = self.apps.get_model('articles', 'Article')
+        first, second, third, fire = [
+            Tag.objects.create(tag=name)
+            for name in ['dragons', 'dragons', 'dragons', 'fire']
+        ]
+        both = Article.objects.create(
+            title="both", slug="both", description="d", body="b"
+        )
+        both.tags.set([second, third, fire])
+        one = Article.objects.create(
+            title="one", slug="one", description="d", body="b"
+        )
+        one.tags.set([third])
+
+        apps = self.migrate()
+        Tag = apps.get_model('articles', 'Tag')
+        Article = apps.get_model('articles', 'Article')
+        self.assertEqual(
+            list(Tag.objects.filter(tag='dragons').values_list('id', flat=True)),
+            [first.id]
+        )
+        self.assertEqual(
+            set(Article.objects.get(pk=both.pk).tags.values_list(
+                'id', flat=True
+            )),
+            {first.id, fire.id}
+        )
+        self.assertEqual(
+            list(Article.objects.get(pk=one.pk).tags.values_list(
+                'id', flat=True
+            )),
+            [first.id]
+        )
+
+
+def create_profile(username):
+    user = User.objects.create_user(
+        username=username, email="{}@gmail.com".format(username)
+    )
+    return Profile.objects.get(user=user)
+
+
+@override_settings(FEED_FANOUT_LIMIT=2)
+class FeedTest(TestCase):
+    """Tests for the feed of articles from followed authors"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.reader = create_profile("reader")
+        self.author = create_profile("author")
+        self.popular = create_profile("popular")
+        for name in ["fan1", "fan2"]:
+            create_profile(name).follow(self.popular)
+        self.reader.follow(self.author)
+        self.reader.follow(self.popular)
+        self.client.force_authenticate(user=self.reader.user)
+
+    def publish(self, author, title):
+        return Article.objects.create(
+            title=title, description="d", body="b", author=author
+        )
+
+    def feed(self, url='/api/article/feed/'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def test_feed_merges_fanned_out_and_popular_articles(self):
+        first = self.publish(self.author, "first")
+        second = self.publish(self.popular, "second")
+        third = self.publish(self.author, "third")
+        self.assertEqual(
+            FeedItem.objects.filter(article=second).count(), 0
+        )
+        self.assertEqual(FeedItem.objects.filter(owner=self.reader).count(), 2)
+        slugs = [a['slug'] for a in self.feed().data['results']]
+        self.assertEqual(slugs, [third.slug, second.slug, first.slug])
+
+    def test_feed_excludes_authors_not_followed(self):
+        self.publish(create_profile("stranger"), "unseen")
+        self.assertEqual(self.feed().data['results'], [])
+
+    def test_follow_backfills_and_unfollow_removes(self):
+        other = create_profile("other")
+        article = self.publish(other, "earlier")
+        self.reader.follow(other)
+        slugs = [a['slug'] for a in self.feed().data['results']]
+        self.assertEqual(slugs, [article.slug])
+        self.reader.unfollow(other)
+        self.assertEqual(self.feed().data['results'], [])
+
+    def test_feed_is_keyset_paginated(self):
+        published = [
+            self.publish([self.author, self.popular][n % 2], "post {}".format(n))
+            for n in range(7)
+        ]
+        slugs = []
+        url = '/api/article/feed/?limit=3'
+        while url:
+            response = self.feed(url)
+            slugs.extend(a['slug'] for a in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(slugs, [a.slug for a in reversed(published)])
+
+    def test_feed_requires_authentication(self):
+        self.client.force_authenticate(user=None)
+        response = self.client.get('/api/article/feed/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_backfill_followers_and_feeds(self):
+        article = self.publish(self.author, "before the feed")
+        popular_article = self.publish(self.popular, "popular")
+        # A database from before the counts and feeds were stored
+        Profile.objects.update(followers_count=0)
+        FeedItem.objects.all().delete()
+
+        out = StringIO()
+        call_command('backfill_followers_and_feeds', batch_size=2, stdout=out)
+        self.assertIn('filled 1 feeds', out.getvalue())
+        self.assertEqual(
+            Profile.objects.get(pk=self.author.pk).followers_count, 1
+        )
+        self.assertEqual(
+            Profile.objects.get(pk=self.popular.pk).followers_count, 3
+        )
+        self.assertEqual(
+            list(FeedItem.objects.values_list('owner', 'article')),
+            [(self.reader.pk, article.pk)]
+        )
+        slugs = [a['slug'] for a in self.feed().data['results']]
+        self.assertEqual(slugs, [popular_article.slug, article.slug])
+
+
+@benchmark
+@override_settings(FEED_FANOUT_LIMIT=20)
+class FeedLoadTest(TestCase):
+    """Feed reads must not slow down as the follow graph grows"""
+
+    def build_reader(self, name, followed_authors, articles_per_author):
+        reader = create_profile(name)
+        for number in range(followed_authors):
+            author = create_profile("{}-author{}".format(name, number))
+            reader.follow(author)
+            for article in range(articles_per_author):
+                Article.objects.create(
+                    title="{} {}".format(author.user.username, article),
+                    description="d", body="b", author=author
+                )
+        popular = create_profile("{}-popular".format(name))
+        for number in range(21):
+            create_profile("{}-fan{}".format(name, number)).follow(popular)
+        reader.follow(popular)
+        Article.objects.create(
+            title="popular", description="d", body="b", author=popular
+        )
+        return reader
+
+    def read_feed(self, reader):
+        client = APIClient()
+        client.force_authenticate(user=reader.user)
+        response = client.get('/api/article/feed/?limit=20')
+        with CaptureQueriesContext(connection) as queries:
+            started = time.time()
+            response = client.get(response.data['next'])
+            elapsed = time.time() - started
+        self.assertEqual(len(response.data['results']), 20)
+        return len(queries), elapsed
+
+    def test_feed_latency_is_flat(self):
+        small = self.build_reader("small", 5, 10)
+        large = self.build_reader("large", 100, 5)
+
+        small_queries, small_time = self.read_feed(small)
+        large_queries, large_time = self.read_feed(large)
+        self.assertEqual(small_queries, large_queries)
+        logger.debug(
+            'feed page: %.1fms following 6 authors, %.1fms following 101 '
+            'authors', small_time * 1000, large_time * 1000
+        )
+
+
+class TrendingTest(TestCase):
+    """Tests for the trending scores and the trending page"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.author = create_profile("trendsetter")
+
+    def publish(self, title, days_idle=0, **counters):
+        article = Article.objects.create(
+            title=title, description="d", body="b", author=self.author
+        )
+        Article.objects.filter(pk=article.pk).update(
+            createdAt=timezone.now() - timedelta(days=days_idle),
+            last_activity=timezone.now() - timedelta(days=days_idle),
+            **counters
+        )
+        return article
+
+    def test_scores_decay_with_activity_age_and_outside_window(self):
+        fresh = self.publish("fresh", likes=10)
+        older = self.publish("older", days_idle=3, likes=10)
+        stale = self.publish("stale", days_idle=30, likes=100)
+        Article.objects.filter(pk=stale.pk).update(trending_score=5)
+        # An old article that is being discussed again
+        revived = self.publish("revived", days_idle=30, likes=10)
+        Comment.update_counts(revived.id, None, 1)
+        out = StringIO()
+        call_command('update_trending_scores', stdout=out)
+        self.assertIn('3 articles', out.getvalue())
+
+        scores = dict(Article.objects.values_list('slug', 'trending_score'))
+        self.assertGreater(scores[revived.slug], scores[older.slug])
+        self.assertGreater(scores[fresh.slug], scores[older.slug])
+        self.assertGreater(scores[older.slug], 0)
+        self.assertEqual(scores[stale.slug], 0)
+
+    def test_engagement_marks_articles_active(self):
+        article = self.publish("quiet", days_idle=30)
+        reader = create_profile("engaged")
+        populate_impression_table()
+        Reaction.add(reader.user, article, impression_registry.get('Like'))
+        article.refresh_from_db()
+        self.assertGreater(
+            article.last_activity, timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_trending_page_orders_by_score(self):
+        quiet = self.publish("quiet", likes=1)
+        loud = self.publish("loud", likes=5, comment_count=3)
+        self.publish("ignored", dislikes=2)
+        call_command('update_trending_scores', stdout=StringIO())
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/article/trending/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [a['slug'] for a in response.data['results']],
+            [loud.slug, quiet.slug]
+        )
+        response = self.client.get('/api/article/trending/?limit=1')
+        self.assertEqual(len(response.data['results']), 1)
+
+
 class ReactionViewTest(TestCase):
 
     def setUp(self):
@@ -222,30 +899,466 @@ class ReactionViewTest(TestCase):
             )
             response_count += 1
 
-    def test_can_remove_reaction(self):
-        for reaction in self.reactions:
-            response = self.client.delete(
-                '/api/articles/{0}/reaction/'.format(self.slug),
-                reaction, format="json"
-            )
-            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+    def test_each_reaction_is_counted_once(self):
+        article = Article.objects.get(slug=self.slug)
+        self.assertEqual(
+            (article.likes, article.dislikes, article.favourite_count),
+            (1, 1, 1)
+        )
+        self.client.delete(
+            '/api/articles/{0}/reaction/'.format(self.slug),
+            {'reaction': 'Like'}, format="json"
+        )
+        article.refresh_from_db()
+        self.assertEqual((article.likes, article.dislikes), (0, 1))
+
+    def test_can_remove_reaction(self):
+        for reaction in self.reactions:
+            response = self.client.delete(
+                '/api/articles/{0}/reaction/'.format(self.slug),
+                reaction, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_can_not_react_more_than_once(self):
+        for reaction in self.reactions:
+            response = self.post_reaction(reaction)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_can_not_remove_non_existing_reaction(self):
+        for reaction in self.reactions:
+            response = self.client.delete(
+                '/api/articles/{0}/reaction/'.format(self.slug),
+                reaction, format="json"
+            )
+            response = self.client.delete(
+                '/api/articles/{0}/reaction/'.format(self.slug),
+                reaction, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  
+
+
+class ImpressionRegistryTest(TestCase):
+    """Impressions are looked up once per worker instead of per request"""
+
+    def setUp(self):
+        populate_impression_table()
+        self.user = User.objects.create_user(
+            username="ranked", email="ranked@gmail.com"
+        )
+        self.article = Article.objects.create(
+            title="registry", description="d", body="b",
+            author=self.user.profile
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/articles/{}/reaction/'.format(self.article.slug)
+
+    def test_registry_loads_once(self):
+        with self.assertNumQueries(1):
+            like = impression_registry.get('Like')
+            impression_registry.get('Dislike')
+            impression_registry.get('Like')
+        self.assertEqual(like, Impression.objects.get(name='Like'))
+
+    def test_registry_is_cleared_when_impressions_change(self):
+        impression_registry.get('Like')
+        Impression.objects.create(name='Love', description='d')
+        with self.assertNumQueries(1):
+            self.assertEqual(impression_registry.get('Love').name, 'Love')
+
+    def test_unknown_impression_is_rejected(self):
+        with self.assertRaises(Impression.DoesNotExist):
+            impression_registry.get('Meh')
+        response = self.client.post(
+            self.url, {'reaction': 'Meh'}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_reaction_runs_fixed_number_of_queries(self):
+        impression_registry.get('Like')
+        # Article, then the upsert and counter update inside a savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post(
+                self.url, {'reaction': 'Like'}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(5):
+            response = self.client.delete(
+                self.url, {'reaction': 'Like'}, format="json"
+            )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class ReactionSwitchTest(TestCase):
+    """Tests for switching between a like and a dislike in one request"""
+
+    def setUp(self):
+        populate_impression_table()
+        self.user = User.objects.create_user(
+            username="fickle", email="fickle@gmail.com"
+        )
+        self.article = Article.objects.create(
+            title="divisive", description="d", body="b",
+            author=self.user.profile
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = '/api/articles/{}/reaction/'.format(self.article.slug)
+
+    def switch(self, reaction, method='put'):
+        return getattr(self.client, method)(
+            self.url, {'reaction': reaction}, format="json"
+        )
+
+    def test_switch_like_to_dislike(self):
+        self.client.post(self.url, {'reaction': 'Like'}, format="json")
+        impression_registry.get('Like')
+        # Article, the switch and both counters inside savepoints, and the
+        # new counts
+        with self.assertNumQueries(8):
+            response = self.switch('Dislike')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['likes'], response.data['dislikes']), (0, 1)
+        )
+        self.assertEqual(
+            list(Reaction.objects.values_list('reaction__name', flat=True)),
+            ['Dislike']
+        )
+
+        response = self.switch('Like', method='patch')
+        self.assertEqual(
+            (response.data['likes'], response.data['dislikes']), (1, 0)
+        )
+
+    def test_switch_without_reaction_adds_it(self):
+        response = self.switch('Like')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['likes'], 1)
+        response = self.switch('Like')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_only_likes_and_dislikes_switch(self):
+        response = self.switch('Favourite')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserArticleStateTest(TestCase):
+    """Tests for looking up a user's reactions to many articles at once"""
+
+    def setUp(self):
+        populate_impression_table()
+        self.user = User.objects.create_user(
+            username="curious", email="curious@gmail.com"
+        )
+        self.articles = [
+            Article.objects.create(
+                title="state {}".format(number), description="d", body="b",
+                author=self.user.profile
+            ) for number in range(3)
+        ]
+        Reaction.add(
+            self.user, self.articles[0], impression_registry.get('Like')
+        )
+        Reaction.add(
+            self.user, self.articles[0], impression_registry.get('Favourite')
+        )
+        Rate.set_rating(self.user, self.articles[1], 4)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_bulk_lookup_runs_one_query(self):
+        slugs = ','.join(article.slug for article in self.articles)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/article/my-reactions/?slugs={},missing'.format(slugs)
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[self.articles[0].slug], {
+            'liked': True, 'disliked': False, 'favourited': True,
+            'my_rating': None
+        })
+        self.assertEqual(results[self.articles[1].slug]['my_rating'], 4)
+        self.assertFalse(any(results[self.articles[2].slug].values()))
+
+    def test_bulk_lookup_is_bounded(self):
+        response = self.client.get('/api/article/my-reactions/?slugs={}'.format(
+            ','.join('slug{}'.format(number) for number in range(101))
+        ))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/article/my-reactions/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_article_list_includes_user_state_on_request(self):
+        response = self.client.get('/api/article/')
+        self.assertNotIn('liked', response.data['results'][0])
+
+        # The validators, the articles with their flags, and the tags
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/article/?with_reactions=true')
+        flags = {
+            article['slug']: (article['liked'], article['my_rating'])
+            for article in response.data['results']
+        }
+        self.assertEqual(flags[self.articles[0].slug], (True, None))
+        self.assertEqual(flags[self.articles[1].slug], (False, 4))
+
+        etag = response['ETag']
+        Reaction.add(
+            self.user, self.articles[2], impression_registry.get('Dislike')
+        )
+        Article.objects.filter(pk=self.articles[2].pk).update(dislikes=0)
+        response = self.client.get(
+            '/api/article/?with_reactions=true', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ConcurrentReactionCountTest(TransactionTestCase):
+    """Counters must match the stored reactions under concurrent writes"""
+
+    threads = 4
+    users = 40
+
+    def setUp(self):
+        populate_impression_table()
+        author = create_profile("stressed")
+        self.article = Article.objects.create(
+            title="contested", description="d", body="b", author=author
+        )
+        User.objects.bulk_create([
+            User(username="reader{}".format(number),
+                 email="reader{}@gmail.com".format(number))
+            for number in range(self.users)
+        ])
+        self.readers = list(User.objects.filter(username__startswith="reader"))
+
+    def react(self, readers, sent):
+        client = APIClient()
+        url = '/api/articles/{}/reaction/'.format(self.article.slug)
+        for number, reader in enumerate(readers):
+            client.force_authenticate(user=reader)
+            requests = [(client.post, 'Like')]
+            if number % 2:
+                requests.append((client.post, 'Favourite'))
+            if number % 3 == 0:
+                requests.append((client.post, 'Dislike'))
+            if number % 5 == 0:
+                requests.append((client.delete, 'Like'))
+            for method, reaction in requests:
+                method(url, {'reaction': reaction}, format="json")
+                sent.append(reaction)
+
+    def test_counters_survive_concurrent_reactions(self):
+        sent = []
+        errors, elapsed = run_concurrently(self.react, [
+            (self.readers[number::self.threads], sent)
+            for number in range(self.threads)
+        ])
+        self.assertEqual(errors, [])
+
+        self.article.refresh_from_db()
+        stored = dict(
+            Reaction.objects.filter(article=self.article).values_list(
+                'reaction__name'
+            ).annotate(Count('id')).order_by()
+        )
+        self.assertEqual(self.article.likes, stored['Like'])
+        self.assertEqual(self.article.dislikes, stored['Dislike'])
+        self.assertEqual(self.article.favourite_count, stored['Favourite'])
+        self.assertGreater(self.article.likes, 0)
+        logger.debug(
+            '%s reaction requests from %s threads in %.2fs',
+            len(sent), self.threads, elapsed
+        )
+
+
+@benchmark
+class ConcurrentReactionStressTest(ConcurrentReactionCountTest):
+    """The same check with many readers, timed"""
+
+    threads = 8
+    users = 1000
+
+
+@override_settings(REACTION_COUNTER_BUFFERING=True)
+class BufferedReactionCountersTest(TransactionTestCase):
+    """Tests for write-behind buffering of the reaction counters"""
+
+    def setUp(self):
+        caches['counters'].clear()
+        populate_impression_table()
+        self.readers = [
+            User.objects.create_user(
+                username="buffered{}".format(number),
+                email="buffered{}@gmail.com".format(number)
+            ) for number in range(3)
+        ]
+        self.articles = [
+            Article.objects.create(
+                title="buffered {}".format(number), description="d",
+                body="b", author=self.readers[0].profile
+            ) for number in range(3)
+        ]
+        self.client = APIClient()
+
+    def tearDown(self):
+        caches['counters'].clear()
+
+    def react(self, reader, article, reaction, method='post'):
+        self.client.force_authenticate(user=reader)
+        return getattr(self.client, method)(
+            '/api/articles/{}/reaction/'.format(article.slug),
+            {'reaction': reaction}, format="json"
+        )
+
+    def flush(self, **options):
+        out = StringIO()
+        call_command('flush_reaction_counters', stdout=out, **options)
+        return out.getvalue()
+
+    def test_reads_include_pending_counts(self):
+        article = self.articles[0]
+        detail = '/api/articles/{}/'.format(article.slug)
+        etag = self.client.get(detail)['ETag']
+        for reader in self.readers:
+            self.react(reader, article, 'Like')
+        self.react(self.readers[0], article, 'Like', method='delete')
+
+        article.refresh_from_db()
+        self.assertEqual(article.likes, 0)
+        response = self.client.get(detail, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['article']['likes'], 2)
+        response = self.client.get('/api/article/')
+        likes = {a['slug']: a['likes'] for a in response.data['results']}
+        self.assertEqual(likes[article.slug], 2)
+
+        self.assertIn('for 1 articles', self.flush())
+        article.refresh_from_db()
+        self.assertEqual(article.likes, 2)
+        self.assertEqual(counters.pending([article.id]), {})
+        self.assertEqual(
+            self.client.get(detail).data['article']['likes'], 2
+        )
+        self.assertIn('for 0 articles', self.flush())
+
+    def test_flush_in_batches(self):
+        for article in self.articles:
+            self.react(self.readers[1], article, 'Dislike')
+            self.react(self.readers[2], article, 'Favourite')
+        self.assertIn('for 3 articles', self.flush(batch_size=2))
+        self.assertEqual(
+            list(Article.objects.values_list(
+                'dislikes', 'favourite_count'
+            ).distinct()),
+            [(1, 1)]
+        )
+
+    def test_changes_after_flush_are_logged_again(self):
+        article = self.articles[0]
+        self.react(self.readers[0], article, 'Like')
+        self.flush()
+        self.react(self.readers[1], article, 'Like')
+        self.flush()
+        article.refresh_from_db()
+        self.assertEqual(article.likes, 2)
+
+    def test_deltas_are_kept_non_negative(self):
+        article = self.articles[0]
+        self.react(self.readers[0], article, 'Like')
+        self.flush()
+        self.react(self.readers[0], article, 'Like', method='delete')
+
+        cache = caches['counters']
+        self.assertEqual(
+            cache.get(counters.delta_key(article.id, 'likes', 'down')), 1
+        )
+        self.assertEqual(
+            counters.pending([article.id]), {article.id: {'likes': -1}}
+        )
+        self.flush()
+        article.refresh_from_db()
+        self.assertEqual(article.likes, 0)
+        self.assertEqual(counters.pending([article.id]), {})
+
+    def test_missing_slot_is_skipped_after_grace(self):
+        cache = caches['counters']
+        self.react(self.readers[0], self.articles[0], 'Like')
+        # A writer that died between taking a slot and storing the article
+        cache.incr(counters.SEQUENCE_KEY)
+        self.react(self.readers[0], self.articles[1], 'Like')
+
+        self.assertIn('for 1 articles', self.flush())
+        with mock.patch.object(counters, 'SLOT_GRACE', 0):
+            self.assertIn('for 1 articles', self.flush())
+        self.assertEqual(
+            list(Article.objects.order_by('id').values_list(
+                'likes', flat=True
+            )),
+            [1, 1, 0]
+        )
+        self.assertEqual(cache.get(counters.FLUSHED_KEY), 3)
+
 
-    def test_can_not_react_more_than_once(self):
-        for reaction in self.reactions:
-            response = self.post_reaction(reaction)
-            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+@benchmark
+class ReactionCounterBenchmark(TransactionTestCase):
+    """Compares reaction throughput on one article with direct and
+    buffered counter updates"""
 
-    def test_can_not_remove_non_existing_reaction(self):
-        for reaction in self.reactions:
-            response = self.client.delete(
-                '/api/articles/{0}/reaction/'.format(self.slug),
-                reaction, format="json"
-            )
-            response = self.client.delete(
-                '/api/articles/{0}/reaction/'.format(self.slug),
-                reaction, format="json"
-            )
-            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)  
+    threads = 8
+    users = 400
+
+    def setUp(self):
+        caches['counters'].clear()
+        populate_impression_table()
+        User.objects.bulk_create([
+            User(username="fan{}".format(number),
+                 email="fan{}@gmail.com".format(number))
+            for number in range(self.users)
+        ])
+        self.fans = list(User.objects.filter(username__startswith="fan"))
+        self.author = create_profile("viral")
+
+    def tearDown(self):
+        caches['counters'].clear()
+
+    def like(self, article, fans):
+        client = APIClient()
+        url = '/api/articles/{}/reaction/'.format(article.slug)
+        for fan in fans:
+            client.force_authenticate(user=fan)
+            response = client.post(url, {'reaction': 'Like'}, format="json")
+            if response.status_code != status.HTTP_200_OK:
+                raise AssertionError(response.data)
+
+    def run_likes(self, title):
+        article = Article.objects.create(
+            title=title, description="d", body="b", author=self.author
+        )
+        errors, elapsed = run_concurrently(self.like, [
+            (article, self.fans[number::self.threads])
+            for number in range(self.threads)
+        ])
+        self.assertEqual(errors, [])
+        return article, self.users / elapsed
+
+    def test_buffered_counters_throughput(self):
+        direct, direct_rate = self.run_likes("direct")
+        with self.settings(REACTION_COUNTER_BUFFERING=True):
+            buffered, buffered_rate = self.run_likes("buffered")
+            counters.flush()
+
+        for article in (direct, buffered):
+            article.refresh_from_db()
+            self.assertEqual(article.likes, self.users)
+        logger.debug(
+            '%s likes from %s threads: %.0f/s direct, %.0f/s buffered',
+            self.users, self.threads, direct_rate, buffered_rate
+        )
 
 
 class ReactionModelTest(TestCase):
@@ -293,6 +1406,75 @@ class ReactionModelTest(TestCase):
             self.new_count = Reaction.objects.count()
             self.assertEqual(self.old_count, self.new_count)
 
+    def test_reactions_are_unique(self):
+        self.create_reaction(reaction=self.like_impression)
+        with self.assertRaises(IntegrityError):
+            with transaction.atomic():
+                self.create_reaction(reaction=self.like_impression)
+
+    def test_add_reports_existing_reaction(self):
+        with self.assertNumQueries(4):
+            reaction = Reaction.add(
+                self.user, self.article, self.like_impression
+            )
+        self.assertEqual(Reaction.objects.get().pk, reaction.pk)
+        self.assertIsNone(
+            Reaction.add(self.user, self.article, self.like_impression)
+        )
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.likes, 1)
+
+
+class DedupeReactionsAndRatesTest(MigrationTestCase):
+    """Tests for removing the duplicates that predate the unique constraints"""
+
+    app = 'articles'
+    migrate_from = '0007_article_trending_score'
+    migrate_to = '0008_unique_reactions_and_rates'
+
+    def test_duplicates_are_removed_and_recounted(self):
+        Article = self.apps.get_model('articles', 'Article')
+        Impression = self.apps.get_model('articles', 'Impression')
+        Reaction = self.apps.get_model('articles', 'Reaction')
+        Rate = self.apps.get_model('articles', 'Rate')
+        User = self.apps.get_model('authentication', 'User')
+        article = Article.objects.create(
+            title="duplicated", description="d", body="b", likes=8
+        )
+        users = [
+            User.objects.create(
+                username="dup{}".format(number),
+                email="dup{}@gmail.com".format(number)
+            ) for number in range(2)
+        ]
+        like = Impression.objects.create(name='Like', description='d')
+        Reaction.objects.bulk_create(
+            [Reaction(article=article, user=users[0], reaction=like)
+             for _ in range(3)] +
+            [Reaction(article=article, user=users[1], reaction=like)]
+        )
+        Rate.objects.bulk_create([
+            Rate(article=article, user=users[0], rating=5),
+            Rate(article=article, user=users[0], rating=1),
+            Rate(article=article, user=users[1], rating=2),
+        ])
+
+        apps = self.migrate()
+        Article = apps.get_model('articles', 'Article')
+        self.assertEqual(
+            apps.get_model('articles', 'Reaction').objects.count(), 2
+        )
+        self.assertEqual(
+            sorted(apps.get_model('articles', 'Rate').objects.values_list(
+                'rating', flat=True
+            )),
+            [2, 5]
+        )
+        article = Article.objects.get(pk=article.pk)
+        self.assertEqual(article.likes, 2)
+        self.assertEqual(article.dislikes, 0)
+        self.assertEqual(float(article.rating), 3.5)
+
 
 class ArticlesModelTestCase(TestCase):
     """Class with tests to do with interacting with the article model"""
@@ -378,6 +1560,62 @@ class TestReadingTime(TestCase):
         self.assertEqual(time, 'Less than a minute')
 
 
+class StoredReadingTimeTest(TestCase):
+    """Tests for the stored word count and reading time"""
+    body = "one two three\n four five six \n"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="red", email="red@gmail.com"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.short = Article.objects.create(
+            title="short", description="d", body=self.body * 20,
+            author=Profile.objects.get(user=self.user)
+        )
+        self.long = Article.objects.create(
+            title="long", description="d", body=self.body * 300
+        )
+
+    def test_word_count_is_stored(self):
+        self.assertEqual(self.short.word_count, 120)
+        self.assertEqual(self.short.reading_minutes, 1)
+        self.assertEqual(self.short.reading_time, 'Less than a minute')
+        self.assertEqual(self.long.reading_minutes, 7)
+
+    def test_update_recomputes_reading_time(self):
+        self.client.put(
+            '/api/articles/short/',
+            {'article': {'body': self.body * 200}}, format="json"
+        )
+        article = Article.objects.get(slug='short')
+        self.assertEqual(article.word_count, 1200)
+        self.assertEqual(article.reading_time, '4 minutes')
+
+    def test_partial_save_of_body_updates_counts(self):
+        self.short.body = "one two"
+        self.short.save(update_fields=['body'])
+        self.short.refresh_from_db()
+        self.assertEqual(self.short.word_count, 2)
+
+    def test_filter_articles_by_reading_time(self):
+        response = self.client.get('/api/article/?max_minutes=5')
+        slugs = [article['slug'] for article in response.data['results']]
+        self.assertEqual(slugs, ['short'])
+
+    def test_populate_reading_time_command(self):
+        Article.objects.update(
+            word_count=0, reading_minutes=0, reading_time=None
+        )
+        out = StringIO()
+        call_command('populate_reading_time', batch_size=1, stdout=out)
+        self.assertIn('populated for 2 articles', out.getvalue())
+        self.long.refresh_from_db()
+        self.assertEqual(self.long.word_count, 1800)
+        self.assertEqual(self.long.reading_time, '7 minutes')
+
+
 class ViewTestComments(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -561,6 +1799,629 @@ class ViewTestComments(TestCase):
             str(result.data['message'])
         )
 
+class CommentParentTest(TestCase):
+    """Tests for replies linked to their parent comment by a foreign key"""
+
+    def setUp(self):
+        self.profile = create_profile("replier")
+        self.article = Article.objects.create(
+            title="threaded", description="d", body="b", author=self.profile
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.profile.user)
+        self.base = '/api/articles/{}/comments/'.format(self.article.slug)
+        body = {"comment": {"body": "top"}}
+        self.parent = self.client.post(self.base, body, format="json").data
+        self.reply = self.client.post(
+            '{}{}/thread/'.format(self.base, self.parent['id']),
+            body, format="json"
+        ).data
+
+    def test_parent_is_rendered_as_before(self):
+        self.assertIsNone(self.parent['parent'])
+        self.assertEqual(self.reply['parent'], str(self.parent['id']))
+        response = self.client.get(
+            '{}{}/thread/'.format(self.base, self.parent['id'])
+        )
+        self.assertEqual(
+            [comment['parent'] for comment in response.data['results']],
+            [str(self.parent['id'])]
+        )
+        response = self.client.get(self.base)
+        self.assertEqual(
+            [comment['id'] for comment in response.data['results']],
+            [self.parent['id']]
+        )
+
+    def test_reply_under_another_article_is_rejected(self):
+        other = Article.objects.create(
+            title="elsewhere", description="d", body="b", author=self.profile
+        )
+        response = self.client.post(
+            '/api/articles/{}/comments/{}/thread/'.format(
+                other.slug, self.parent['id']
+            ),
+            {"comment": {"body": "lost"}}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Comment.objects.filter(article=other).exists())
+        self.assertEqual(
+            Comment.objects.get(pk=self.parent['id']).thread_count, 1
+        )
+
+    def test_deleting_a_comment_deletes_its_replies(self):
+        response = self.client.delete(
+            '{}{}/'.format(self.base, self.parent['id'])
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Comment.objects.count(), 0)
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.comment_count, 0)
+
+
+class CommentParentMigrationTest(MigrationTestCase):
+    """Tests for moving comment parents from text to a foreign key"""
+
+    app = 'articles'
+    migrate_from = '0010_article_star_counts'
+    migrate_to = '0011_comment_parent_foreign_key'
+
+    def test_parents_are_converted_and_orphans_removed(self):
+        Article = self.apps.get_model('articles', 'Article')
+        Comment = self.apps.get_model('articles', 'Comment')
+        article = Article.objects.create(
+            title="threaded", description="d", body="b", comment_count=5
+        )
+
+        def comment(parent):
+            return Comment.objects.create(
+                body="c", article=article, parent=parent
+            )
+
+        parent = comment(None)
+        untouched = comment('')
+        reply = comment(str(parent.id))
+        orphan = comment('999999')
+        answer = comment(str(orphan.id))
+
+        apps = self.migrate()
+        Comment = apps.get_model('articles', 'Comment')
+        self.assertEqual(
+            dict(Comment.objects.values_list('id', 'parent_id')),
+            {parent.id: None, untouched.id: None, reply.id: parent.id}
+        )
+        article = apps.get_model('articles', 'Article').objects.get(
+            pk=article.pk
+        )
+        self.assertEqual(article.comment_count, 3)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Comment._meta.db_table
+            )
+        self.assertIn('comment_article_parent_idx', constraints)
+        self.assertTrue(any(
+            constraint['foreign_key'] == (Comment._meta.db_table, 'id')
+            and constraint['columns'] == ['parent_id']
+            for constraint in constraints.values()
+        ))
+
+
+class CommentAuthorTest(TestCase):
+    """Tests for the live author identity shown on comments"""
+
+    def setUp(self):
+        self.profile = create_profile("scribe")
+        self.article = Article.objects.create(
+            title="signed", description="d", body="b", author=self.profile
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.profile.user)
+        self.base = '/api/articles/{}/comments/'.format(self.article.slug)
+
+    def comment(self, profile, parent=None):
+        return Comment.objects.create(
+            body="by {}".format(profile.user.username), article=self.article,
+            author=profile, parent=parent
+        )
+
+    def test_author_is_embedded(self):
+        self.profile.avatar = 'https://example.com/scribe.png'
+        self.profile.save()
+        response = self.client.post(
+            self.base, {"comment": {"body": "hello"}}, format="json"
+        )
+        self.assertEqual(response.data['author'], {
+            'username': 'scribe', 'avatar': 'https://example.com/scribe.png'
+        })
+        self.assertEqual(response.data['author_name'], 'scribe')
+
+    def test_renamed_author_is_shown_by_new_name(self):
+        parent = self.comment(self.profile)
+        self.comment(self.profile, parent)
+        User.objects.filter(pk=self.profile.user.pk).update(
+            username='renamed'
+        )
+        for url in (self.base, '{}{}/thread/'.format(self.base, parent.id)):
+            comment = self.client.get(url).data['results'][0]
+            self.assertEqual(comment['author']['username'], 'renamed')
+            self.assertEqual(comment['author_name'], 'renamed')
+        tree = self.client.get(self.base + 'tree/').data
+        self.assertEqual(tree[0]['replies'][0]['author_name'], 'renamed')
+
+    def test_listing_does_not_query_each_author(self):
+        for number in range(3):
+            self.comment(create_profile("commenter{}".format(number)))
+        # One query for the validators and one for the page with authors
+        with self.assertNumQueries(2):
+            response = self.client.get(self.base)
+        self.assertEqual(
+            [comment['author_name'] for comment in response.data['results']],
+            ['commenter0', 'commenter1', 'commenter2']
+        )
+
+    def test_backfill_command(self):
+        table = connection.ops.quote_name(Comment._meta.db_table)
+        stale = self.comment(self.profile)
+        self.comment(self.profile)
+        with connection.cursor() as cursor:
+            # The migration leaves the column in the table
+            cursor.execute(
+                "UPDATE {} SET author_name = 'old name' WHERE id = %s".format(
+                    table
+                ),
+                [stale.id]
+            )
+
+        out = StringIO()
+        call_command('backfill_comment_author_names', batch_size=1, stdout=out)
+        self.assertIn('Refreshed the author name of 2 comments', out.getvalue())
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT DISTINCT author_name FROM {}'.format(table))
+            self.assertEqual(cursor.fetchall(), [('scribe',)])
+            # Check the deferred foreign keys so the table can be altered
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        call_command('backfill_comment_author_names', drop=True, stdout=out)
+        self.assertIn('Dropped', out.getvalue())
+        call_command('backfill_comment_author_names', stdout=out)
+        self.assertIn('Nothing to backfill', out.getvalue())
+
+    def test_author_changes_change_the_listing_validators(self):
+        self.comment(self.profile)
+        etag = self.client.get(self.base)['ETag']
+
+        self.profile.avatar = 'https://example.com/new.png'
+        self.profile.save()
+        response = self.client.get(self.base, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+
+        user = self.profile.user
+        user.username = 'renamed'
+        user.save()
+        response = self.client.get(self.base, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['results'][0]['author_name'], 'renamed'
+        )
+        self.assertEqual(
+            parse_http_date(response['Last-Modified']),
+            int(User.objects.get(pk=user.pk).updated_at.timestamp())
+        )
+
+
+class CommentTreeTest(TestCase):
+    """Tests for the nested comment tree of an article"""
+
+    def setUp(self):
+        self.profile = create_profile("arborist")
+        self.article = Article.objects.create(
+            title="rooted", description="d", body="b", author=self.profile
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.profile.user)
+        self.url = '/api/articles/{}/comments/tree/'.format(self.article.slug)
+
+        def comment(body, parent=None):
+            return Comment.objects.create(
+                body=body, article=self.article, author=self.profile,
+                parent=parent
+            )
+        self.first = comment("first")
+        self.reply = comment("reply", self.first)
+        self.nested = comment("nested", self.reply)
+        self.second = comment("second")
+        comment("another reply", self.first)
+
+    def bodies(self, nodes):
+        return [
+            (node['body'], self.bodies(node['replies'])) for node in nodes
+        ]
+
+    def test_tree_is_built_from_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.bodies(response.data), [
+            ('first', [('reply', [('nested', [])]), ('another reply', [])]),
+            ('second', []),
+        ])
+
+    def test_depth_limit(self):
+        response = self.client.get(self.url + '?depth=2')
+        self.assertEqual(self.bodies(response.data)[0], (
+            'first', [('reply', []), ('another reply', [])]
+        ))
+        response = self.client.get(self.url + '?depth=0')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_subtree(self):
+        response = self.client.get(
+            self.url + '?root={}'.format(self.reply.id)
+        )
+        self.assertEqual(
+            self.bodies(response.data), [('reply', [('nested', [])])]
+        )
+        response = self.client.get(self.url + '?root=999999')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_missing_article(self):
+        response = self.client.get('/api/articles/missing/comments/tree/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CommentPaginationTest(TestCase):
+    """Tests for the cursor pagination of comment and thread listings"""
+
+    def setUp(self):
+        self.profile = create_profile("paginator")
+        self.article = Article.objects.create(
+            title="paged", description="d", body="b", author=self.profile
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.profile.user)
+        self.base = '/api/articles/{}/comments/'.format(self.article.slug)
+        self.comments = [
+            Comment.objects.create(
+                body=str(number), article=self.article, author=self.profile
+            )
+            for number in range(5)
+        ]
+        self.replies = [
+            Comment.objects.create(
+                body=str(number), article=self.article, author=self.profile,
+                parent=self.comments[0]
+            )
+            for number in range(3)
+        ]
+
+    def walk(self, url):
+        bodies = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            bodies += [comment['body'] for comment in response.data['results']]
+            url = response.data['next']
+        return bodies
+
+    def test_comments_are_paged_oldest_first(self):
+        self.assertEqual(
+            self.walk(self.base + '?limit=2'), ['0', '1', '2', '3', '4']
+        )
+
+    def test_threads_are_paged(self):
+        thread = '{}{}/thread/?limit=2'.format(self.base, self.comments[0].id)
+        self.assertEqual(self.walk(thread), ['0', '1', '2'])
+
+    def test_page_is_stable_when_comments_are_posted(self):
+        response = self.client.get(self.base + '?limit=2')
+        Comment.objects.create(
+            body="late", article=self.article, author=self.profile
+        )
+        self.assertEqual(
+            self.walk(response.data['next']), ['2', '3', '4', 'late']
+        )
+
+    def test_page_does_not_count_rows(self):
+        # One query for the validators and one for the page
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.base + '?limit=2')
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('COUNT(', ' '.join(q['sql'] for q in queries))
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.base + '?cursor=garbage')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ArticleBulkDeleteTest(TestCase):
+    """Tests for deleting an article with set-based statements"""
+
+    def setUp(self):
+        self.profile = create_profile("deleter")
+        self.reader = create_profile("reader")
+        self.article = Article.objects.create(
+            title="doomed", description="d", body="b", author=self.profile
+        )
+        self.other = Article.objects.create(
+            title="kept", description="d", body="b", author=self.profile
+        )
+        tags = Tag.objects.bulk_create([Tag(tag='a'), Tag(tag='b')])
+        for article in (self.article, self.other):
+            article.tags.set(tags)
+            comment = Comment.objects.create(
+                body="c", article=article, author=self.reader
+            )
+            Comment.objects.create(
+                body="r", article=article, author=self.reader, parent=comment
+            )
+            Reaction.objects.create(article=article, user=self.reader.user)
+            Rate.objects.create(article=article, user=self.reader.user, rating=4)
+            FeedItem.objects.create(
+                owner=self.reader, article=article,
+                article_created=article.createdAt
+            )
+        # A reply posted from the kept article under a doomed comment
+        self.stray = Comment.objects.create(
+            body="stray", article=self.other, author=self.reader,
+            parent=Comment.objects.filter(article=self.article).first()
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.profile.user)
+
+    def related_counts(self, article):
+        return [
+            Comment.objects.filter(article=article).count(),
+            Reaction.objects.filter(article=article).count(),
+            Rate.objects.filter(article=article).count(),
+            FeedItem.objects.filter(article=article).count(),
+            article.tags.count(),
+        ]
+
+    def test_delete_removes_the_article_and_its_rows(self):
+        Article.objects.filter(pk=self.other.pk).update(comment_count=3)
+        # A reply posted from the doomed article under a kept comment
+        kept = Comment.objects.filter(
+            article=self.other, parent=None
+        ).first()
+        Comment.objects.create(
+            body="crossed", article=self.article, author=self.reader,
+            parent=kept
+        )
+        Comment.objects.filter(pk=kept.pk).update(thread_count=2)
+        response = self.client.delete(
+            '/api/articles/{}/'.format(self.article.slug)
+        )
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Article.objects.filter(pk=self.article.pk).exists())
+        self.assertEqual(self.related_counts(self.article), [0, 0, 0, 0, 0])
+        self.assertFalse(Comment.objects.filter(pk=self.stray.pk).exists())
+        self.assertEqual(self.related_counts(self.other), [2, 1, 1, 1, 2])
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.comment_count, 2)
+        kept.refresh_from_db()
+        self.assertEqual(kept.thread_count, 1)
+        # Reactions and rates are deleted rather than left without article
+        self.assertFalse(Reaction.objects.filter(article=None).exists())
+        self.assertFalse(Rate.objects.filter(article=None).exists())
+
+    def test_statements_do_not_grow_with_related_rows(self):
+        for _ in range(20):
+            Comment.objects.create(
+                body="c", article=self.article, author=self.reader
+            )
+        # A savepoint around the lock, the counts of replies across
+        # articles and one statement per child table and for the article
+        with self.assertNumQueries(13):
+            total, deleted = Article.bulk_delete(self.article.id)
+        self.assertEqual(deleted['articles.Comment'], 23)
+        self.assertEqual(total, 23 + 1 + 1 + 1 + 2 + 1)
+
+    def test_rows_are_deleted_in_batches(self):
+        for _ in range(4):
+            Comment.objects.create(
+                body="c", article=self.article, author=self.reader
+            )
+        with CaptureQueriesContext(connection) as queries:
+            Article.bulk_delete(self.article.id, batch_size=2)
+        comment_deletes = [
+            query for query in queries
+            if query['sql'].startswith('DELETE FROM "articles_comment"')
+        ]
+        # 1 stray reply, then 6 comments in batches of 2 and an empty one
+        self.assertEqual(len(comment_deletes), 1 + 4)
+        self.assertEqual(self.related_counts(self.article), [0, 0, 0, 0, 0])
+
+
+@benchmark
+class ArticleDeleteBenchmark(TestCase):
+    """Deletes articles with 100,000 related rows, through the collector
+    and with the set-based statements"""
+
+    comments = 80000
+    reactions = 10000
+    rates = 10000
+
+    def create_article(self):
+        article = Article.objects.create(
+            title="huge", description="d", body="b", author=self.profile
+        )
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {} (body, author_id, article_id, thread_count, '
+                'created_at, updated_at) '
+                "SELECT 'comment', %s, %s, 0, now(), now() "
+                'FROM generate_series(1, %s)'.format(
+                    quote(Comment._meta.db_table)
+                ),
+                [self.profile.pk, article.pk, self.comments]
+            )
+            # Replies to the first comments, so the cascade has to follow them
+            cursor.execute(
+                'INSERT INTO {table} (body, author_id, article_id, '
+                'thread_count, created_at, updated_at, parent_id) '
+                "SELECT 'reply', author_id, article_id, 0, now(), now(), id "
+                'FROM {table} WHERE article_id = %s LIMIT %s'.format(
+                    table=quote(Comment._meta.db_table)
+                ),
+                [article.pk, self.comments // 10]
+            )
+            cursor.execute(
+                'INSERT INTO {} (article_id) '
+                'SELECT %s FROM generate_series(1, %s)'.format(
+                    quote(Reaction._meta.db_table)
+                ),
+                [article.pk, self.reactions]
+            )
+            cursor.execute(
+                'INSERT INTO {} (article_id, rating) '
+                'SELECT %s, 3 FROM generate_series(1, %s)'.format(
+                    quote(Rate._meta.db_table)
+                ),
+                [article.pk, self.rates]
+            )
+        return article
+
+    def setUp(self):
+        self.profile = create_profile("hoarder")
+
+    def test_bulk_delete_against_the_collector(self):
+        article = self.create_article()
+        started = time.perf_counter()
+        article.delete()
+        collector = time.perf_counter() - started
+
+        article = self.create_article()
+        started = time.perf_counter()
+        total, _ = Article.bulk_delete(article.id)
+        bulk = time.perf_counter() - started
+
+        self.assertEqual(
+            total, 1 + self.comments * 11 // 10 + self.reactions + self.rates
+        )
+        self.assertFalse(Comment.objects.exists())
+        logger.debug(
+            'deleting an article with %s related rows: collector %.2fs, '
+            'set-based statements %.2fs', total - 1, collector, bulk
+        )
+
+
+@benchmark
+class CommentPaginationBenchmark(TestCase):
+    """Reads the first and a deep page of a 100,000 comment listing"""
+
+    comments = 100000
+    repeats = 20
+
+    def setUp(self):
+        self.profile = create_profile("prolific")
+        self.article = Article.objects.create(
+            title="popular", description="d", body="b", author=self.profile
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {} (body, author_id, article_id, thread_count, '
+                'created_at, updated_at) '
+                "SELECT 'comment ' || n, %s, %s, 0, "
+                "now() - interval '1 second' * (%s - n), now() "
+                'FROM generate_series(1, %s) AS n'.format(
+                    connection.ops.quote_name(Comment._meta.db_table)
+                ),
+                [self.profile.pk, self.article.pk, self.comments,
+                 self.comments]
+            )
+            cursor.execute('ANALYZE {}'.format(
+                connection.ops.quote_name(Comment._meta.db_table)
+            ))
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.profile.user)
+        self.base = '/api/articles/{}/comments/'.format(self.article.slug)
+
+    def time_page(self, url):
+        self.client.get(url)
+        started = time.perf_counter()
+        for _ in range(self.repeats):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return (time.perf_counter() - started) / self.repeats, response
+
+    def test_deep_page_costs_the_same_as_the_first(self):
+        paginator = CommentKeysetPagination()
+        first, _ = self.time_page(self.base)
+        deep_comment = Comment.objects.get(
+            article=self.article, body='comment {}'.format(self.comments - 5)
+        )
+        cursor = paginator.encode_cursor(deep_comment)
+        deep, response = self.time_page(self.base + '?cursor=' + cursor)
+        self.assertEqual(
+            [comment['body'] for comment in response.data['results']],
+            ['comment {}'.format(number)
+             for number in range(self.comments - 4, self.comments + 1)]
+        )
+        logger.debug(
+            '%s comments: first page %.1fms, last page %.1fms',
+            self.comments, first * 1000, deep * 1000
+        )
+
+        # The page is a range scan of the index from the cursor position
+        listing = CommentListCreateAPIView().get_listing(
+            self.article.slug, parent=None
+        )
+        plan = listing.filter(paginator.get_position_filter(
+            deep_comment.created_at, deep_comment.id
+        )).order_by(*paginator.ordering)[:6].explain()
+        self.assertIn('comment_article_created_idx', plan)
+
+
+class ConcurrentCommentCountTest(TransactionTestCase):
+    """Comment and thread counts must stay exact under concurrent writes"""
+
+    threads = 8
+    comments_per_thread = 25
+
+    def setUp(self):
+        self.profile = create_profile("talkative")
+        self.article = Article.objects.create(
+            title="discussed", description="d", body="b", author=self.profile
+        )
+        self.parent = Comment.objects.create(
+            body="parent", article=self.article, author=self.profile
+        )
+        Comment.update_counts(self.article.id, None, 1)
+        self.updated_at = Article.objects.get(pk=self.article.pk).updatedAt
+
+    def comment(self):
+        client = APIClient()
+        client.force_authenticate(user=self.profile.user)
+        base = '/api/articles/{}/comments/'.format(self.article.slug)
+        thread = '{}{}/thread/'.format(base, self.parent.id)
+        body = {"comment": {"body": "busy"}}
+        for number in range(self.comments_per_thread):
+            response = client.post(
+                thread if number % 2 else base, body, format="json"
+            )
+            if number % 5 == 0:
+                client.delete('{}{}/'.format(base, response.data['id']))
+
+    def test_counts_stay_exact(self):
+        errors, _ = run_concurrently(self.comment, [()] * self.threads)
+        self.assertEqual(errors, [])
+
+        article = Article.objects.get(pk=self.article.pk)
+        self.assertEqual(
+            article.comment_count,
+            Comment.objects.filter(article=self.article).count()
+        )
+        self.assertEqual(
+            Comment.objects.get(pk=self.parent.pk).thread_count,
+            Comment.objects.filter(parent=self.parent).count()
+        )
+        self.assertGreater(article.comment_count, self.threads)
+        # Counting comments does not count as editing the article
+        self.assertEqual(article.updatedAt, self.updated_at)
+
+
 class RateModelTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(
@@ -576,6 +2437,52 @@ class RateModelTest(TestCase):
         new_count = Rate.objects.count()
         self.assertNotEqual(self.old_count, new_count)
 
+    def test_set_rating_gives_up_when_the_row_keeps_vanishing(self):
+        # Every insert conflicts with a row that is gone when looked up
+        with mock.patch(
+            'authors.apps.articles.models.insert_or_ignore', return_value=None
+        ):
+            with self.assertRaises(IntegrityError):
+                Rate.set_rating(self.user, self.article, 4)
+
+    def test_set_rating_keeps_aggregates(self):
+        other = User.objects.create_user(
+            username="turnip", email="turnip@gmail.com"
+        )
+        _, previous = Rate.set_rating(self.user, self.article, 5)
+        self.assertIsNone(previous)
+        Rate.set_rating(other, self.article, 2)
+        _, previous = Rate.set_rating(self.user, self.article, 3)
+        self.assertEqual(previous, 5)
+
+        self.article.refresh_from_db()
+        self.assertEqual(
+            (self.article.rating_sum, self.article.rating_count), (5, 2)
+        )
+        self.assertEqual(float(self.article.rating), 2.5)
+        self.assertEqual(
+            list(self.article.rating_histogram.values()), [0, 1, 1, 0, 0]
+        )
+
+    def test_reconcile_rebuilds_aggregates(self):
+        Rate.objects.create(user=self.user, article=self.article, rating=4)
+        unrated = Article.objects.create(
+            title="unrated", description="test", body="testing article"
+        )
+        Article.objects.filter(pk=unrated.pk).update(
+            rating_sum=9, rating_count=3, rating=3
+        )
+        out = StringIO()
+        with self.assertNumQueries(1):
+            call_command('reconcile_ratings', stdout=out)
+        self.assertIn('2 articles', out.getvalue())
+        self.assertEqual(
+            list(Article.objects.order_by('id').values_list(
+                'rating_sum', 'rating_count', 'rating', 'stars_4'
+            )),
+            [(4, 1, 4, 1), (0, 0, 0, 0)]
+        )
+
 
 class RateViewTest(TestCase):
     def setUp(self):
@@ -619,11 +2526,33 @@ class RateViewTest(TestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
-    def test_can_not_rate_more_than_once(self):
+    def test_can_change_rating(self):
         self.client.post(
             '/api/articles/test-article/rate/', self.rate, format="json"
         )
         response = self.client.post(
+            '/api/articles/test-article/rate/', {"rate": 2}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['average_rating'], 2.0)
+        article = Article.objects.get(slug=self.slug)
+        self.assertEqual((article.rating_sum, article.rating_count), (2, 1))
+
+    def test_rating_histogram(self):
+        self.client.post(
             '/api/articles/test-article/rate/', self.rate, format="json"
         )
-        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.credentials()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/articles/test-article/rate/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rating_count'], 1)
+        self.assertEqual(
+            response.data['histogram'],
+            {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0}
+        )
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/articles/test-article/')
+        self.assertEqual(
+            response.data['article']['rating_histogram']['4'], 1
+        )
@@ -4,9 +4,15 @@ from .views import (
     CreateArticle,
     ArticleRetrieveUpdate,
     ArticleList,
+    ArticleSearch,
+    ArticleFeed,
+    TrendingArticles,
+    UserArticleState,
     ReactionView,
     TagList,
+    TagCloud,
     CommentListCreateAPIView,
+    CommentTreeAPIView,
     CommentRetrieveUpdateDestroyAPIView,
     ThreadListCreateAPIView,
     ShareArticle,
@@ -19,8 +25,10 @@ urlpatterns = [
     path('articles/<str:slug>/', ArticleRetrieveUpdate.as_view()),
     path('article/', ArticleList.as_view()),
     path('tags/', TagList.as_view()),
+    path('tags/cloud/', TagCloud.as_view()),
     path('articles/<str:slug>/reaction/', ReactionView.as_view()),
     path('articles/<str:slug>/comments/', CommentListCreateAPIView.as_view()),
+    path('articles/<str:slug>/comments/tree/', CommentTreeAPIView.as_view()),
     path('articles/<str:slug>/comments/<str:id>/',
          CommentRetrieveUpdateDestroyAPIView.as_view()
          ),
@@ -29,6 +37,10 @@ urlpatterns = [
          ),
     path('article/share/', ShareArticle.as_view()),
     path('article/my-articles/', ReturnArticle.as_view()),
+    path('article/search/', ArticleSearch.as_view()),
+    path('article/feed/', ArticleFeed.as_view()),
+    path('article/trending/', TrendingArticles.as_view()),
+    path('article/my-reactions/', UserArticleState.as_view()),
     
     path('articles/<str:slug>/rate/', RateView.as_view()),
 ]
@@ -1,3 +1,5 @@
+from datetime import datetime
+
 import sendgrid
 from decouple import config
 from django.contrib.sites.shortcuts import get_current_site
@@ -21,20 +23,30 @@ from rest_framework.permissions import (
 from pyisemail import is_email
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Avg, Count
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Subquery
 
 from .models import (
+    SEARCH_CONFIG,
     Article,
     Reaction,
     Impression,
+    impression_registry,
     Tag,
-    Comment,
-    Rate
+    Comment
 )
 from authors.apps.authentication.backends import JWTAuthentication
-from authors.apps.profiles.serializers import ProfileListSerializer
 from authors.apps.articles.exceptions import NotFoundException
+from authors.apps.core.conditional import conditional_get, make_etag
 
+from . import counters
+from .pagination import (
+    ArticleKeysetPagination,
+    CommentKeysetPagination,
+    FeedPagination
+)
 from .renderers import (
     ArticleJSONRenderer,
     ReactionJSONRenderer,
@@ -43,24 +55,29 @@ from .renderers import (
 )
 from .serializers import (
     ArticleSerializer,
+    ArticleDetailSerializer,
+    ArticleListSerializer,
+    ArticleUserStateListSerializer,
     ReactionSerializer,
     TagSerializer,
-    CommentCreateSerializer,
+    TagCloudSerializer,
     CommentSerializer,
+    CommentTreeSerializer,
     ShareArticleSerializer,
     RateSerializer
 )
 
 
-class ReturnArticle(APIView):
+class ReturnArticle(generics.ListAPIView):
     renderer_classes = (ArticleJSONRenderer,)
-    serializer_class = ArticleSerializer
+    serializer_class = ArticleListSerializer
     permission_classes = (IsAuthenticated,)
+    pagination_class = ArticleKeysetPagination
 
-    def get(self, request):
-        articles = Article.objects.filter(author_id=request.user.id).order_by('-createdAt')
-        serializer = self.serializer_class(articles, many=True)
-        return Response({'article': serializer.data}, status=status.HTTP_200_OK)    
+    def get_queryset(self):
+        return Article.objects.select_related(
+            'author__user'
+        ).prefetch_related('tags').filter(author_id=self.request.user.id)
 
 
 class CreateArticle(generics.CreateAPIView):
@@ -75,8 +92,6 @@ class CreateArticle(generics.CreateAPIView):
         serializer_context = {'author': request.user.profile}
         serializer_data = request.data.get('article', {})
 
-        time_to_read = Article.article_reading_time(serializer_data['body'])
-        serializer_data['reading_time'] = time_to_read
         serializer = self.serializer_class(data=serializer_data,
                                            context=serializer_context)
 
@@ -93,37 +108,23 @@ class ArticleRetrieveUpdate(APIView):
     renderer_class = (ArticleJSONRenderer,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
 
+    def get_validators(self, request, slug):
+        """Derive the validators from the article loaded for the response,
+        keeping the endpoint at a single query"""
+        self.article = Article.get_article_detail(slug=slug)
+        return Article.get_validators(self.article)
+
+    @conditional_get
     def get(self, request, slug):
         """Get a single article
         :params request request slug
         :return article"""
 
-        article = Article.get_article(slug=slug)
-        serializer = self.serializer_class(article)
-
-        profile = Article.get_profile(serializer.data['author'])
-        profile_serializer = ProfileListSerializer(profile)
+        serializer = ArticleDetailSerializer(self.article)
 
         return Response(
-                {"article": {
-                             "author": profile_serializer.data,
-                             "title": serializer.data['title'],
-                             "description": serializer.data['description'],
-                             "body": serializer.data['body'],
-                             "createdAt": serializer.data['createdAt'],
-                             "updatedAt": serializer.data['updatedAt'],
-                             "slug": serializer.data['slug'],
-                             "fav_count": serializer.data['favourite_count'],
-                             "likes": serializer.data['likes'],
-                             "dislikes": serializer.data['dislikes'],
-                             "tagList": serializer.data['tagList'],
-                             "reading_time": serializer.data['reading_time'],
-                             "comment_count": serializer.data['comment_count'],
-                             "rating": serializer.data['rating']
-                            },
-                 "message": "Success"
-                 },
-                status=status.HTTP_200_OK
+            {"article": serializer.data, "message": "Success"},
+            status=status.HTTP_200_OK
         )
 
     def put(self, request, slug):
@@ -157,14 +158,169 @@ class ArticleRetrieveUpdate(APIView):
 class ArticleList(generics.ListAPIView):
 
     renderer_classes = (ArticleJSONRenderer,)
-    serializer_class = ArticleSerializer
+    serializer_class = ArticleListSerializer
     permission_classes = (AllowAny,)
+    pagination_class = ArticleKeysetPagination
+
+    def get_validators(self, request):
+        """Validate against the state of the articles on the requested page,
+        fetched without their bodies or tags"""
+        fields = Article.VALIDATOR_FIELDS
+        if self.with_user_state():
+            fields += Reaction.USER_STATE_FIELDS
+        queryset = self.get_queryset().prefetch_related(None).values_list(
+            *fields
+        )
+        rows = self.paginator.paginate_queryset(queryset, request, view=self)
+        etag = make_etag(
+            self.paginator.has_next,
+            sorted(counters.pending([row[0] for row in rows]).items()),
+            *rows
+        )
+        timestamps = [
+            timestamp for row in rows for timestamp in row[1:]
+            if isinstance(timestamp, datetime)
+        ]
+        return etag, max(timestamps, default=None)
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def with_user_state(self):
+        """Whether the caller asked for their reactions and rating of each
+        article with `?with_reactions=true`"""
+        return self.request.user.is_authenticated and (
+            self.request.query_params.get('with_reactions') in ('true', '1')
+        )
+
+    def get_serializer_class(self):
+        if self.with_user_state():
+            return ArticleUserStateListSerializer
+        return ArticleListSerializer
 
     def get_queryset(self):
-        queryset = Article.objects.all().order_by('-createdAt')
+        queryset = Article.objects.select_related(
+            'author__user'
+        ).prefetch_related('tags')
+        if self.with_user_state():
+            queryset = Article.annotate_user_state(queryset, self.request.user)
+
+        max_minutes = self.request.query_params.get('max_minutes')
+        if max_minutes is not None:
+            try:
+                max_minutes = int(max_minutes)
+            except ValueError:
+                message = 'max_minutes must be a whole number'
+                raise exceptions.ParseError(message)
+            queryset = queryset.filter(reading_minutes__lte=max_minutes)
         return queryset
 
 
+class UserArticleState(APIView):
+    """Class to get the reactions and rating the user gave to each of
+    several articles"""
+
+    permission_classes = (IsAuthenticated,)
+    max_slugs = 100
+
+    def get(self, request):
+        slugs = [
+            slug for slug in request.query_params.get('slugs', '').split(',')
+            if slug
+        ]
+        if not slugs:
+            message = 'Provide the article slugs to look up'
+            raise exceptions.ParseError(message)
+        if len(slugs) > self.max_slugs:
+            message = 'At most {} articles can be looked up at once'.format(
+                self.max_slugs
+            )
+            raise exceptions.ParseError(message)
+
+        rows = Article.annotate_user_state(
+            Article.objects.filter(slug__in=slugs), request.user
+        ).values('slug', *Reaction.USER_STATE_FIELDS)
+        return Response(
+            {'results': {row.pop('slug'): row for row in rows}},
+            status=status.HTTP_200_OK
+        )
+
+
+class TrendingArticles(generics.ListAPIView):
+    """Class to get the articles with the highest trending scores"""
+
+    renderer_classes = (ArticleJSONRenderer,)
+    serializer_class = ArticleListSerializer
+    permission_classes = (AllowAny,)
+    default_limit = 20
+    max_limit = 100
+
+    def get_queryset(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            message = 'limit must be a whole number'
+            raise exceptions.ParseError(message)
+        limit = max(1, min(limit, self.max_limit))
+
+        return Article.objects.filter(
+            trending_score__gt=0
+        ).order_by('-trending_score', '-id').select_related(
+            'author__user'
+        ).prefetch_related('tags')[:limit]
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response({'results': serializer.data}, status=status.HTTP_200_OK)
+
+
+class ArticleFeed(generics.ListAPIView):
+    """Class to get the articles of the authors a user follows"""
+
+    renderer_classes = (ArticleJSONRenderer,)
+    serializer_class = ArticleListSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = FeedPagination
+
+    def get_queryset(self):
+        return Article.objects.select_related(
+            'author__user'
+        ).prefetch_related('tags')
+
+
+class ArticleSearch(generics.ListAPIView):
+    """Class to search articles by text, optionally filtered by tag
+    and author, with the best matches first"""
+
+    renderer_classes = (ArticleJSONRenderer,)
+    serializer_class = ArticleListSerializer
+    permission_classes = (AllowAny,)
+
+    def get_queryset(self):
+        params = self.request.query_params
+        text = params.get('q', '').strip()
+        if not text:
+            message = 'A search query is required'
+            raise exceptions.ParseError(message)
+
+        query = SearchQuery(text, config=SEARCH_CONFIG)
+        queryset = Article.objects.filter(search_vector=query)
+
+        tag = params.get('tag')
+        if tag:
+            queryset = queryset.filter(tags__tag=tag)
+        author = params.get('author')
+        if author:
+            queryset = queryset.filter(author__user__username=author)
+
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).select_related(
+            'author__user'
+        ).prefetch_related('tags').order_by('-rank', '-id')
+
+
 class TagList(generics.ListAPIView):
     """Class to get a list of existing tags"""
 
@@ -180,6 +336,27 @@ class TagList(generics.ListAPIView):
         }, status=status.HTTP_200_OK)
         
 
+class TagCloud(generics.ListAPIView):
+    """Class to get tags in use with their article counts, most used first"""
+
+    permission_classes = (AllowAny,)
+    serializer_class = TagCloudSerializer
+    cache_timeout = 60 * 5
+
+    def get_queryset(self):
+        return Tag.objects.annotate(
+            article_count=Count('articles')
+        ).filter(article_count__gt=0).order_by('-article_count', 'tag')
+
+    def list(self, request, *args, **kwargs):
+        cache_key = 'tag-cloud:{}'.format(request.build_absolute_uri())
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, self.cache_timeout)
+        return Response(data, status=status.HTTP_200_OK)
+
+
 class ReactionView(APIView):
     """Class to like or dislike an article"""
 
@@ -217,23 +394,21 @@ class ReactionView(APIView):
             }
         return message
 
+    def get_impression(self, request):
+        try:
+            return impression_registry.get(request.data.get('reaction'))
+        except Impression.DoesNotExist:
+            message = 'You have entered invalid data.'
+            raise exceptions.PermissionDenied(message)
+
     def check_validation(self, slug, request):
-        username = request.user.username
-        article = Article.get_article(slug=slug)
-        impression = Impression.objects.get(name=request.data.get('reaction'))
-        serializer_data = {}
         serializer_context = {
             'user': request.user,
-            'article': article,
-            'reaction': Impression.objects.get(
-                name=request.data.get('reaction')
-                ),
-            }
-        serializer_data['reaction'] = impression.id
-        serializer_data['user'] = request.user.id
-        serializer_data['article'] = article.id
+            'article': Article.get_article(slug=slug),
+            'reaction': self.get_impression(request),
+        }
         serializer = self.serializer_class(
-            data=serializer_data, context=serializer_context
+            data={}, context=serializer_context
         )
         serializer.is_valid(raise_exception=True)
         return serializer
@@ -252,77 +427,148 @@ class ReactionView(APIView):
             status=status.HTTP_200_OK
         )
 
-    def delete(self, request, slug):
-
-        try:
-            article = Article.get_article(slug=slug)
-            reaction_impression = Impression.objects.get(
-                name=request.data['reaction']
-            )
-            reaction = Reaction.objects.get(
-                article=article.id,
-                user=request.user.id,
-                reaction=reaction_impression.id
-            )
-            message = self.check_reaction(
-                request.data['reaction'],
-                request
-            )
-            ReactionSerializer.reaction_value(
-                reaction_impression.id, article.slug, article, -1
+    def put(self, request, slug):
+        article = Article.get_article(slug=slug)
+        impression = self.get_impression(request)
+        if impression.name not in Reaction.OPPOSITES:
+            message = 'Only a like and a dislike can be switched'
+            raise exceptions.ParseError(message)
+        if not Reaction.switch(request.user, article, impression):
+            message = 'You have already {}d this article.'.format(
+                impression.name
             )
-            reaction.delete()
-            return Response(message, status=status.HTTP_204_NO_CONTENT)
-
-        except Reaction.DoesNotExist:
-            message = 'You have not yet interacted with this article'
             raise exceptions.ParseError(message)
 
-        except Reaction.DoesNotExist:
+        message = self.check_reaction(impression.name, request)
+        message.update(Reaction.get_counts(article.id))
+        return Response(message, status=status.HTTP_200_OK)
+
+    patch = put
+
+    def delete(self, request, slug):
+        article = Article.get_article(slug=slug)
+        reaction_impression = self.get_impression(request)
+        if not Reaction.remove(request.user, article, reaction_impression):
             message = 'You have not yet interacted with this article'
             raise exceptions.ParseError(message)
 
+        message = self.check_reaction(request.data['reaction'], request)
+        return Response(message, status=status.HTTP_204_NO_CONTENT)
+
+
+class CommentListingMixin(object):
+    """Cursor paginated listing of the comments of an article that share a
+    parent, used for the top-level comments and for threads"""
+
+    pagination_class = CommentKeysetPagination
+
+    def get_listing(self, slug, parent):
+        # A join on the slug would keep the article's comments from being
+        # read in order from the index, so look its id up in a subquery
+        article = Article.objects.filter(slug=slug).values('id')[:1]
+        return Comment.objects.select_related('author__user').filter(
+            article=Subquery(article), parent=parent
+        )
+
+    def get_listing_validators(self, request, slug, parent):
+        """Validate against the state of the comments on the requested page
+        and of their authors, whose names and avatars are embedded"""
+        rows = self.paginator.paginate_queryset(
+            self.get_listing(slug, parent).values_list(
+                'id', 'updated_at', 'thread_count',
+                'author__updated_at', 'author__user__updated_at'
+            ),
+            request, view=self
+        )
+        etag = make_etag(self.paginator.has_next, *rows)
+        return etag, max(
+            (
+                changed for row in rows for changed in (row[1],) + row[3:]
+                if changed is not None
+            ),
+            default=None
+        )
+
+    def list_comments(self, slug, parent):
+        page = self.paginate_queryset(self.get_listing(slug, parent))
+        serializer = self.serializer_class(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-class CommentListCreateAPIView(generics.ListCreateAPIView):
+
+class CommentListCreateAPIView(CommentListingMixin,
+                               generics.ListCreateAPIView):
     renderer_classes = (CommentJSONRenderer,)
     serializer_class = CommentSerializer
-    serializer_create_class = CommentCreateSerializer
     permission_classes = (IsAuthenticated,)
     authentication_classes = (JWTAuthentication,)
     queryset = Comment.objects.all()
 
     def post(self, request, slug):
         try:
+            article = Article.objects.get(slug=slug)
             serializer_context = {
                 'author': request.user.profile,
-                'article': Article.objects.get(slug=slug)
+                'article': article
             }
             serializer_data = request.data.get('comment', {})
 
-            serializer = self.serializer_create_class(
+            serializer = self.serializer_class(
                 data=serializer_data,
                 context=serializer_context
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
-            comment = Comment()
-            count = comment.get_count(slug=slug)
-            new_count = count + 1
-            Comment.comment_article(count=new_count, slug_param=slug)
+            with transaction.atomic():
+                serializer.save()
+                Comment.update_counts(article.id, None, 1)
 
         except Article.DoesNotExist:
             raise NotFoundException("The Article does not exist")
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def get_validators(self, request, slug, *args, **kwargs):
+        return self.get_listing_validators(request, slug, parent=None)
+
+    @conditional_get
     def get(self, request, slug, *args, **kwargs):
-        comment = Comment.objects.select_related('article').filter(
-            article__slug=slug
-        )
-        main_comment = comment.filter(parent=None).order_by('id')
+        return self.list_comments(slug, parent=None)
 
-        serializer = self.serializer_class(main_comment, many=True)
 
+class CommentTreeAPIView(generics.GenericAPIView):
+    """Class to get the comments of an article nested under their parents,
+    optionally only below the comment `root` and down to `depth` levels"""
+
+    renderer_classes = (CommentJSONRenderer,)
+    serializer_class = CommentTreeSerializer
+    permission_classes = (IsAuthenticated,)
+    authentication_classes = (JWTAuthentication,)
+
+    def get_positive_int(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        if value < 1:
+            message = '{} must be a positive whole number'.format(name)
+            raise exceptions.ParseError(message)
+        return value
+
+    def get(self, request, slug):
+        try:
+            tree = Comment.get_tree(
+                slug,
+                root_id=self.get_positive_int('root'),
+                max_depth=self.get_positive_int('depth')
+            )
+        except Comment.DoesNotExist:
+            raise NotFoundException("The comment does not exist")
+        if not tree and not Article.objects.filter(slug=slug).exists():
+            raise NotFoundException("The Article does not exist")
+
+        serializer = self.serializer_class(tree, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -336,7 +582,9 @@ class CommentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
         try:
             serializer_context = {
                 'author': request.user.profile,
-                'id': Comment.objects.get(id=id)
+                'id': Comment.objects.select_related('author__user').get(
+                    id=id
+                )
             }
             serializer_data = request.data.get('comment', {})
 
@@ -358,19 +606,15 @@ class CommentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
     def destroy(self, instance, slug, id):
         try:
             comment = Comment.objects.get(id=id)
-            comment_count = Comment()
-
-            count = comment_count.get_count(slug=slug)
-            new_count = count - 1
-            Comment.comment_article(count=new_count, slug_param=slug)
-
-            if comment.parent is not None:
-                thread_count = comment_count.get_thread_count_delete(id=id)
-                new_thread_count = thread_count - 1
-                if new_thread_count < 0:
-                    new_thread_count = 0
-                Comment.thread_comment_delete(count=new_thread_count, id_param=id)
-            comment.delete()
+            Article.objects.only('id').get(slug=slug)
+            with transaction.atomic():
+                # Replies are deleted along with their comment, and
+                # concurrent deletes only uncount the rows they removed
+                deleted, _ = Comment.objects.filter(pk=comment.pk).delete()
+                if deleted:
+                    Comment.update_counts(
+                        comment.article_id, comment.parent_id, -deleted
+                    )
         except Article.DoesNotExist:
             raise NotFoundException("The Article does not exist")
         except Comment.DoesNotExist:
@@ -382,7 +626,8 @@ class CommentRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView)
         )
 
 
-class ThreadListCreateAPIView(generics.ListCreateAPIView):
+class ThreadListCreateAPIView(CommentListingMixin,
+                              generics.ListCreateAPIView):
     renderer_classes = (ThreadJSONRenderer,)
     serializer_class = CommentSerializer
     permission_classes = (IsAuthenticated,)
@@ -391,15 +636,18 @@ class ThreadListCreateAPIView(generics.ListCreateAPIView):
 
     def post(self, request, slug, id):
         try:
-            if Comment.objects.get(id=id).parent is not None:
+            article = Article.objects.get(slug=slug)
+            # Replies stay under the article of their parent
+            parent = Comment.objects.get(id=id, article=article)
+            if parent.parent_id is not None:
                 return Response(
                     {"message": "Parent comment is already a sub comment"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
             serializer_context = {
                 'author': request.user.profile,
-                'article': Article.objects.get(slug=slug),
-                'parent': Comment.objects.get(id=id).id
+                'article': article,
+                'parent': parent
             }
             serializer_data = request.data.get('comment', {})
 
@@ -408,16 +656,9 @@ class ThreadListCreateAPIView(generics.ListCreateAPIView):
                 context=serializer_context
             )
             serializer.is_valid(raise_exception=True)
-            serializer.save()
-            comment = Comment()
-            count = comment.get_count(slug=slug)
-            new_count = count + 1
-            Comment.comment_article(count=new_count, slug_param=slug)
-
-            
-            thread_count = comment.get_thread_count(id=id)
-            new_thread_count = thread_count + 1
-            Comment.thread_comment(count=new_thread_count, id_param=id)
+            with transaction.atomic():
+                serializer.save()
+                Comment.update_counts(article.id, parent.id, 1)
 
         except Article.DoesNotExist:
             raise NotFoundException("The Article does not exist")
@@ -426,15 +667,12 @@ class ThreadListCreateAPIView(generics.ListCreateAPIView):
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def get(self, request, slug, id, *args, **kwargs):
-        comment = Comment.objects.select_related('article').filter(
-            article__slug=slug
-        )
-        main_comment = comment.filter(parent=id).order_by('id')
-
-        serializer = self.serializer_class(main_comment, many=True)
+    def get_validators(self, request, slug, id, *args, **kwargs):
+        return self.get_listing_validators(request, slug, parent=id)
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @conditional_get
+    def get(self, request, slug, id, *args, **kwargs):
+        return self.list_comments(slug, parent=id)
 
 
 class ShareArticle(APIView):
@@ -513,17 +751,23 @@ def send_mail(sender_email, receiver_mail, mail_subject, content):
 
 
 class RateView(APIView):
-    permission_classes = (IsAuthenticated,)
+    permission_classes = (IsAuthenticatedOrReadOnly,)
     serializer_class = RateSerializer
 
-    def average_rating(self, article):
-       ratings = Rate.objects.filter(
-           article=article.id).aggregate(Avg('rating'))
-       if ratings['rating__avg'] == None:
-           return 0
-       else:
-           average_rating = float(ratings['rating__avg'])
-           return round(average_rating, 2)
+    def get(self, request, slug):
+        try:
+            article = Article.objects.only(
+                'rating', 'rating_count', *Article.STAR_FIELDS.values()
+            ).get(slug=slug)
+        except Article.DoesNotExist:
+            message = "No article was found"
+            raise exceptions.NotFound(message)
+
+        return Response({
+            "average_rating": float(article.rating),
+            "rating_count": article.rating_count,
+            "histogram": article.rating_histogram
+        }, status=status.HTTP_200_OK)
 
     def post(self, request, slug):
         rate = request.data.get("rate")
@@ -543,8 +787,9 @@ class RateView(APIView):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        avg_rating = self.average_rating(article)
-        Article.objects.filter(slug=slug).update(rating=avg_rating)
+        avg_rating = float(Article.objects.values_list(
+            'rating', flat=True
+        ).get(pk=article.id))
 
         return Response(
             {"data": serializer.data, "average_rating": avg_rating},
@@ -1,9 +1,9 @@
 import jwt
-from decouple import config
 from django.conf import settings
 from rest_framework import authentication, exceptions
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 
+from . import user_cache
 from .models import User
 
 
@@ -34,13 +34,13 @@ class JWTAuthentication(BaseAuthentication):
         returns a token to the user
         """
         try:
-            result = jwt.decode(token, config('SECRET_KEY'))
+            result = jwt.decode(token, settings.SECRET_KEY)
         except:
             message = 'Failed to decode token'
             raise exceptions.AuthenticationFailed(message)
 
         try:
-            user = User.objects.get(username=result['name'])
+            user = user_cache.get_user(result['name'])
         except User.DoesNotExist:
             message = 'No user was found'
             raise exceptions.AuthenticationFailed(message)
@@ -1,7 +1,9 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 
 from authors.apps.profiles.models import Profile
+from . import user_cache
 from .models import User
 
 
@@ -15,3 +17,16 @@ def create_user_profile(sender, instance, created, *args, **kwargs):
     """
     if instance and created:
         instance.profile = Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, *args, **kwargs):
+    """
+    Method to drop the cached authentication fields of a user that changed,
+    right away and again once the change is committed, since a request
+    may cache the old row in between.
+    """
+    user_id, username = instance.pk, instance.username
+    user_cache.invalidate(user_id, username)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id, username))
@@ -3,16 +3,23 @@ from authors.apps.authentication.models import User, UserManager
 from authors.apps.authentication.views import (
     generate_ver_token, send_verification_link
     )
+from authors.apps.core.testing import benchmark
 import datetime
+import logging
+import time
 
 import jwt
 from decouple import config
-from django.test import TestCase
-from rest_framework import serializers, status
-from rest_framework.test import APIClient
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework import exceptions, serializers, status
+from rest_framework.test import APIClient, APIRequestFactory
 
+from . import user_cache
+from .backends import JWTAuthentication
 from .validators import ValidateUserDetails
 
+logger = logging.getLogger(__name__)
+
 
 class ModelTestCase(TestCase):
     """Class with tests to do with registration model"""
@@ -302,3 +309,93 @@ class ValidatorsTestCase(TestCase):
             serializers.ValidationError,
             lambda: self.validator.is_password_valid(
                 self.user['user']['password2']))
+
+
+class CachedAuthenticationTest(TransactionTestCase):
+    """Tests for authenticating requests from the cached user fields"""
+
+    def setUp(self):
+        user_cache.get_cache().clear()
+        self.user = User.objects.create_user(
+            username="cached", email="cached@gmail.com", password="password1"
+        )
+        self.token = self.user.auth_token
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION='Token {}'.format(token or self.token)
+        )
+        return JWTAuthentication().authenticate(request)[0]
+
+    def test_user_is_only_queried_once(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(str(user), 'cached@gmail.com')
+        # Fields that are not cached are loaded when they are used
+        self.assertEqual(user.profile.user_id, self.user.pk)
+        self.assertEqual(user.created_at, self.user.created_at)
+
+    @override_settings(AUTH_USER_CACHING=False)
+    def test_cache_can_be_turned_off(self):
+        self.authenticate()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_renamed_user_is_not_found_by_old_name(self):
+        self.authenticate()
+        self.user.username = 'renamed'
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+        self.assertEqual(
+            self.authenticate(self.user.auth_token).username, 'renamed'
+        )
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_user_is_rejected(self):
+        self.authenticate()
+        self.user.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.authenticate()
+
+
+@benchmark
+class CachedAuthenticationBenchmark(TestCase):
+    """Measures authenticate() throughput with and without the auth cache"""
+
+    requests = 2000
+
+    def setUp(self):
+        user_cache.get_cache().clear()
+        user = User.objects.create_user(
+            username="busy", email="busy@gmail.com", password="password1"
+        )
+        self.request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION='Token {}'.format(user.auth_token)
+        )
+
+    def throughput(self):
+        backend = JWTAuthentication()
+        backend.authenticate(self.request)
+        started = time.perf_counter()
+        for _ in range(self.requests):
+            backend.authenticate(self.request)
+        return self.requests / (time.perf_counter() - started)
+
+    def test_throughput(self):
+        cached = self.throughput()
+        with override_settings(AUTH_USER_CACHING=False):
+            uncached = self.throughput()
+        logger.debug(
+            'authenticate(): %.0f/s with the cache, %.0f/s without',
+            cached, uncached
+        )
@@ -0,0 +1,75 @@
+"""
+Cache of the user fields that authenticating a request needs.
+
+Tokens carry the username, so entries are keyed on it and hold the fields
+in FIELDS. The user is rebuilt from them with its other fields deferred,
+and those load on first access as with `.only()`. Saving or deleting a user
+drops its entries, including the one under a previous username, and drops
+them again once the transaction commits. Entries also expire after the
+`auth` cache's timeout, which bounds how stale a user can be in a worker
+whose cache another worker's change does not reach. Point the cache at
+memcached or redis so the workers share it.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router
+
+from .models import User
+
+FIELDS = ('id', 'username', 'email', 'is_active', 'is_staff', 'is_superuser')
+
+
+def get_cache():
+    return caches['auth']
+
+
+def is_enabled():
+    return settings.AUTH_USER_CACHING
+
+
+def user_key(username):
+    # Usernames may hold characters that memcached does not allow in keys
+    digest = hashlib.md5(username.encode('utf-8')).hexdigest()
+    return 'auth:user:{}'.format(digest)
+
+
+def id_key(user_id):
+    return 'auth:username:{}'.format(user_id)
+
+
+def get_user(username):
+    """Get the user with a username, from the cache when it holds it
+    :raises User.DoesNotExist"""
+    if not is_enabled():
+        return User.objects.get(username=username)
+
+    cache = get_cache()
+    values = cache.get(user_key(username))
+    if values is None:
+        values = User.objects.values(*FIELDS).get(username=username)
+        cache.set_many({
+            user_key(username): values,
+            id_key(values['id']): username
+        })
+
+    field_names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in values
+    ]
+    return User.from_db(
+        router.db_for_read(User), field_names,
+        [values[name] for name in field_names]
+    )
+
+
+def invalidate(user_id, username):
+    """Drop the cached fields of a user, under its current username and
+    the one it was cached under"""
+    cache = get_cache()
+    keys = [user_key(username), id_key(user_id)]
+    previous = cache.get(id_key(user_id))
+    if previous is not None:
+        keys.append(user_key(previous))
+    cache.delete_many(keys)
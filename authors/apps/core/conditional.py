@@ -0,0 +1,50 @@
+import calendar
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Build a quoted ETag from the values that identify a representation"""
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional_get(view_method):
+    """
+    Decorator for the `get` method of an API view that answers with
+    304 Not Modified when the client's validators still match.
+
+    The view must define `get_validators(request, *args, **kwargs)`
+    returning an `(etag, last_modified)` pair, either of which may be None.
+    Validators are computed before the view method runs, so they should
+    come from a cheap query rather than from the serialized payload.
+
+    When an ETag is given it alone decides whether the representation
+    changed, since counters can change without moving the timestamp the
+    Last-Modified header is derived from.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request, *args, **kwargs)
+        last_modified = last_modified and calendar.timegm(
+            last_modified.utctimetuple()
+        )
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=None if etag else last_modified
+        )
+        if response is None:
+            response = view_method(self, request, *args, **kwargs)
+
+        if response.status_code in (200, 304):
+            if etag:
+                response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    return wrapper
@@ -0,0 +1,115 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates a queryset on a (timestamp, id) key instead of an offset.
+
+    Each page is fetched with a range condition on the key, so a page deep
+    in the listing costs the same as the first one and no count query is
+    run. The cursor handed to the client is an opaque encoding of the key
+    of the last row on the current page.
+    """
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(*position))
+
+        # Fetch one extra row to find out whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_position_filter(self, timestamp, pk, ordering=None):
+        """
+        Build the condition selecting rows that come after the given key,
+        for this paginator's ordering unless another one is given.
+        The redundant bound on the timestamp alone lets the database start
+        the scan on the composite index at the cursor position.
+        """
+        ordering = ordering or self.ordering
+        timestamp_field, pk_field = [field.lstrip('-') for field in ordering]
+        lookup = 'lt' if ordering[0].startswith('-') else 'gt'
+        inclusive_lookup = lookup + 'e'
+
+        return Q(**{
+            '{}__{}'.format(timestamp_field, inclusive_lookup): timestamp
+        }) & (
+            Q(**{'{}__{}'.format(timestamp_field, lookup): timestamp}) |
+            Q(**{
+                timestamp_field: timestamp,
+                '{}__{}'.format(pk_field, lookup): pk
+            })
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            decoded = urlsafe_b64decode(encoded.encode('ascii')).decode('ascii')
+            timestamp, pk = decoded.rsplit('|', 1)
+            timestamp = parse_datetime(timestamp)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def encode_cursor(self, instance):
+        timestamp_field, pk_field = [
+            field.lstrip('-') for field in self.ordering
+        ]
+        position = '{}|{}'.format(
+            getattr(instance, timestamp_field).isoformat(),
+            getattr(instance, pk_field)
+        )
+        return urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
@@ -0,0 +1,14 @@
+from django.test.runner import DiscoverRunner
+
+from .testing import BENCHMARK_TAG
+
+
+class TestRunner(DiscoverRunner):
+    """Runs the tests without the benchmarks unless they are selected with
+    `manage.py test --tag benchmark`"""
+
+    def __init__(self, tags=None, exclude_tags=None, **kwargs):
+        exclude_tags = set(exclude_tags or ())
+        if BENCHMARK_TAG not in (tags or ()):
+            exclude_tags.add(BENCHMARK_TAG)
+        super().__init__(tags=tags, exclude_tags=exclude_tags, **kwargs)
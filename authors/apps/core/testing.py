@@ -0,0 +1,75 @@
+"""
+Helpers for tests that exercise the database from concurrent threads or
+through the migrations.
+
+Tests that only measure timings are tagged `benchmark`. The test runner
+leaves them out unless they are asked for with `--tag benchmark`, and
+they report their timings with `logger.debug` rather than printing.
+"""
+import time
+from threading import Thread
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase, tag
+
+BENCHMARK_TAG = 'benchmark'
+
+benchmark = tag(BENCHMARK_TAG)
+
+
+def run_concurrently(target, arguments):
+    """Call target once per tuple of arguments, each call in its own thread
+    with its own database connection, and wait for all of them
+    :params target arguments
+    :return the exceptions the calls raised, seconds taken"""
+    errors = []
+
+    def run(*args):
+        try:
+            target(*args)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    workers = [Thread(target=run, args=args) for args in arguments]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return errors, time.perf_counter() - started
+
+
+class MigrationTestCase(TransactionTestCase):
+    """Test case that unapplies the migrations of `app` back to
+    `migrate_from`, so a test can add rows as they were before
+    `migrate_to` through `self.apps` and then call `migrate`. The latest
+    migrations are applied again afterwards."""
+
+    app = None
+    migrate_from = None
+    migrate_to = None
+
+    def setUp(self):
+        self.apps = self.migrate_app(self.migrate_from)
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def migrate(self):
+        """Apply the migrations up to `migrate_to`
+        :return the models as they are after it"""
+        return self.migrate_app(self.migrate_to)
+
+    def migrate_app(self, name):
+        executor = MigrationExecutor(connection)
+        executor.migrate([(self.app, name)])
+        executor.loader.build_graph()
+        # The other apps stay fully migrated
+        return executor.loader.project_state([(self.app, name)] + [
+            node for node in executor.loader.graph.leaf_nodes()
+            if node[0] != self.app
+        ]).apps
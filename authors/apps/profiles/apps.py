@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ProfilesConfig(AppConfig):
     name = 'authors.apps.profiles'
+    label = 'profiles'
+
+    def ready(self):
+        import authors.apps.profiles.signals
@@ -11,6 +11,8 @@ class Profile(TimeStampedModel):
     following = models.ManyToManyField(
         'self', related_name='followers', symmetrical=False
     )
+    # Kept in step with `following` by the signals of this app
+    followers_count = models.PositiveIntegerField(default=0, db_index=True)
 
     def __str__(self):
         self.user.username
@@ -0,0 +1,52 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+
+from .models import Profile
+
+
+def follow_pairs(instance, reverse, pk_set):
+    """
+    Return the (follower id, followed id) pairs touched by a change made
+    from either side of the `following` relation
+    """
+    if reverse:
+        return [(pk, instance.pk) for pk in pk_set]
+    return [(instance.pk, pk) for pk in pk_set]
+
+
+@receiver(m2m_changed, sender=Profile.following.through)
+def update_followers_count(sender, instance, action, reverse, pk_set,
+                           *args, **kwargs):
+    """
+    Method to keep `Profile.followers_count` in step with follows.
+    Only follows that are really added or removed are counted: Django
+    reports just the new rows on add, and the rows that exist are looked
+    up before a remove.
+    """
+    if action == 'post_add':
+        pairs = follow_pairs(instance, reverse, pk_set)
+        change = 1
+    elif action == 'pre_remove':
+        pairs = follow_pairs(instance, reverse, pk_set)
+        existing = sender.objects.filter(
+            from_profile_id__in=[follower for follower, _ in pairs],
+            to_profile_id__in=[followed for _, followed in pairs]
+        ).values_list('from_profile_id', 'to_profile_id')
+        pairs = set(pairs) & set(existing)
+        change = -1
+    else:
+        return
+
+    if not pairs:
+        return
+    # A count that was never backfilled must not go below zero
+    if reverse:
+        Profile.objects.filter(pk=instance.pk).update(followers_count=Greatest(
+            F('followers_count') + change * len(pairs), 0
+        ))
+    else:
+        Profile.objects.filter(
+            pk__in=[followed for _, followed in pairs]
+        ).update(followers_count=Greatest(F('followers_count') + change, 0))
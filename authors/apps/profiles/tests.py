@@ -173,3 +173,46 @@ class ViewTestCase(TestCase):
             '/api/profiles/{}/follow/'.format(self.other_username)
         )
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class FollowersCountTestCase(TestCase):
+    """Tests for the stored number of followers of a profile"""
+
+    def setUp(self):
+        self.profiles = [
+            User.objects.create_user(
+                username=name, email="{}@gmail.com".format(name)
+            ).profile
+            for name in ["first", "second", "third"]
+        ]
+
+    def followers_count(self, profile):
+        profile.refresh_from_db()
+        return profile.followers_count
+
+    def test_follow_and_unfollow_update_count(self):
+        first, second, third = self.profiles
+        first.follow(third)
+        second.follow(third)
+        first.follow(third)
+        self.assertEqual(self.followers_count(third), 2)
+        first.unfollow(third)
+        first.unfollow(third)
+        self.assertEqual(self.followers_count(third), 1)
+
+    def test_count_from_followers_side(self):
+        first, second, third = self.profiles
+        third.followers.add(first, second)
+        self.assertEqual(self.followers_count(third), 2)
+        third.followers.remove(first)
+        self.assertEqual(self.followers_count(third), 1)
+
+    def test_unfollow_does_not_go_below_zero(self):
+        first, second, third = self.profiles
+        first.follow(third)
+        second.follow(third)
+        third.__class__.objects.filter(pk=third.pk).update(followers_count=0)
+        first.unfollow(third)
+        self.assertEqual(self.followers_count(third), 0)
+        third.followers.remove(second)
+        self.assertEqual(self.followers_count(third), 0)
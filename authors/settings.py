@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'corsheaders',
     'django_extensions',
@@ -152,6 +153,9 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 # called `INSTALLED_APPS`.
 AUTH_USER_MODEL = 'authentication.User'
 
+# Leaves the tests tagged benchmark out of `manage.py test` by default
+TEST_RUNNER = 'authors.apps.core.runner.TestRunner'
+
 REST_FRAMEWORK = {
     'EXCEPTION_HANDLER': 'authors.apps.core.exceptions.core_exception_handler',
     'NON_FIELD_ERRORS_KEY': 'error',
@@ -167,3 +171,46 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 5,
 }
+
+# Authors with more followers than this do not have their articles written
+# into each follower's feed; the feed reads their articles instead.
+FEED_FANOUT_LIMIT = config('FEED_FANOUT_LIMIT', default=1000, cast=int)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Holds reaction counter deltas when they are buffered. Every worker and
+    # the flusher must share it and entries must never be evicted, so
+    # production should point it at memcached or redis.
+    'counters': {
+        'BACKEND': config(
+            'COUNTER_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('COUNTER_CACHE_LOCATION', default='counters'),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1000000},
+    },
+    # Holds the user fields that authenticating a request needs. Entries
+    # are dropped when a user changes, but only in the cache of the worker
+    # making the change unless the workers share memcached or redis.
+    'auth': {
+        'BACKEND': config(
+            'AUTH_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('AUTH_CACHE_LOCATION', default='auth'),
+        'TIMEOUT': config('AUTH_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
+# Authenticate requests from the auth cache instead of querying the user
+AUTH_USER_CACHING = config('AUTH_USER_CACHING', default=True, cast=bool)
+
+# Buffer like, dislike and favourite counts in the counters cache and let
+# the flush_reaction_counters command write them to the articles in batches
+REACTION_COUNTER_BUFFERING = config(
+    'REACTION_COUNTER_BUFFERING', default=False, cast=bool
+)